@@ -0,0 +1,294 @@
+import os
+import time
+import queue
+import threading
+from concurrent.futures import Future
+
+from playwright.sync_api import sync_playwright
+
+from app.config import (
+    HEADLESS,
+    CHROME_PATH,
+    PAGE_LOAD_TIMEOUT,
+    BROWSER_PROFILE_DIR,
+    BROWSER_HEALTH_INTERVAL,
+)
+
+
+# =========================
+# PLAYWRIGHT FIX (BẮT BUỘC)
+# =========================
+# Ép Playwright KHÔNG dùng browser nội bộ
+os.environ["PLAYWRIGHT_BROWSERS_PATH"] = "0"
+
+LAUNCH_ARGS = [
+    "--disable-blink-features=AutomationControlled",
+    "--disable-infobars",
+    "--no-sandbox",
+]
+
+
+def get_chrome_path():
+    """Tự động tìm Chrome trên Windows (hoặc dùng CHROME_PATH nếu có)"""
+    if CHROME_PATH:
+        return CHROME_PATH
+
+    paths = [
+        r"C:\Program Files\Google\Chrome\Application\chrome.exe",
+        r"C:\Program Files (x86)\Google\Chrome\Application\chrome.exe",
+    ]
+    for path in paths:
+        if os.path.exists(path):
+            return path
+    raise FileNotFoundError("❌ Không tìm thấy Google Chrome trên máy")
+
+
+class Lease:
+    """
+    Trang được cho mượn trong một lần crawl.
+    preloaded=True: trang đã mở sẵn target_url (bỏ qua goto),
+    responses: response browser nhận được lúc mở sẵn (để capture không bỏ sót trang đầu).
+    """
+
+    def __init__(self, page, preloaded=False, responses=()):
+        self.page = page
+        self.preloaded = preloaded
+        self.responses = list(responses)
+
+
+class BrowserPool:
+    """
+    Browser chạy lâu dài, giữ "ấm" giữa các lần crawl:
+    - persistent context (disk cache + cookie trong BROWSER_PROFILE_DIR)
+    - luôn có sẵn một trang đã mở target_url, lần crawl sau nhận ngay trang đó
+    - kiểm tra sức khỏe định kỳ, browser chết / trang crash -> khởi động lại
+
+    Playwright sync gắn với thread đã tạo nó, nên mọi thao tác browser
+    chạy trong MỘT thread riêng; run() gửi job sang và chờ kết quả.
+    """
+
+    def __init__(self, profile_dir=BROWSER_PROFILE_DIR, health_interval=BROWSER_HEALTH_INTERVAL):
+        self.profile_dir = profile_dir
+        self.health_interval = health_interval
+        self.target_url = None
+
+        self.restarts = 0
+        self.leases = 0
+
+        self._jobs = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+        # Chỉ dùng trong thread của pool
+        self._playwright = None
+        self._context = None
+        self._standby = None
+        self._standby_url = None
+        self._standby_responses = []
+        self._crashed = False
+
+    # =========================
+    # PUBLIC (gọi từ thread bất kỳ)
+    # =========================
+    def start(self, target_url=None):
+        """Bật thread browser + mở sẵn target_url (không chặn)"""
+        with self._lock:
+            if target_url:
+                self.target_url = target_url
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._loop, name="browser-pool", daemon=True)
+                self._thread.start()
+        self._jobs.put(("warm", None, None))
+        return self
+
+    def run(self, target_url, fn):
+        """
+        Chạy fn(lease) trong thread browser, chặn tới khi xong.
+        Trả về kết quả (hoặc ném lại exception) của fn.
+        target_url=None: job tự goto (vd: fallback từng trang) -> cho mượn tab trống riêng,
+        trang mở sẵn giữ nguyên, không phải mở lại target_url sau mỗi job.
+        """
+        self.start(target_url)
+        future = Future()
+        self._jobs.put(("run" if target_url else "scratch", fn, future))
+        return future.result()
+
+    def close(self, timeout=10):
+        with self._lock:
+            thread = self._thread
+            self._thread = None
+        if thread and thread.is_alive():
+            self._jobs.put(None)
+            thread.join(timeout)
+
+    # =========================
+    # THREAD BROWSER
+    # =========================
+    def _loop(self):
+        with sync_playwright() as p:
+            self._playwright = p
+            while True:
+                try:
+                    job = self._jobs.get(timeout=self.health_interval)
+                except queue.Empty:
+                    # Rảnh -> kiểm tra sức khỏe, mở sẵn trang nếu cần
+                    self._safe_ready()
+                    continue
+
+                if job is None:
+                    break
+
+                kind, fn, future = job
+                if kind == "warm":
+                    self._safe_ready()
+                    continue
+
+                if not future.set_running_or_notify_cancel():
+                    continue
+
+                try:
+                    lease = self._lend() if kind == "run" else self._lend_scratch()
+                except BaseException as e:
+                    future.set_exception(e)
+                    continue
+
+                try:
+                    future.set_result(fn(lease))
+                except BaseException as e:
+                    future.set_exception(e)
+                finally:
+                    self._give_back(lease)
+
+            self._shutdown()
+
+    def _launch(self):
+        started = time.perf_counter()
+        self._crashed = False
+        self._context = self._playwright.chromium.launch_persistent_context(
+            self.profile_dir,
+            executable_path=get_chrome_path(),
+            headless=HEADLESS,
+            args=LAUNCH_ARGS,
+        )
+        self._context.on("close", self._on_crash)
+        print(f"[Browser] Đã khởi động Chrome ({time.perf_counter() - started:.1f}s)")
+
+    def _on_crash(self, *_):
+        self._crashed = True
+
+    def _shutdown(self):
+        self._standby = None
+        if self._context:
+            context, self._context = self._context, None
+            try:
+                context.remove_listener("close", self._on_crash)
+                context.close()
+            except Exception:
+                pass
+
+    def _restart(self, reason):
+        self.restarts += 1
+        print(f"[Browser] Khởi động lại browser ({reason})")
+        self._shutdown()
+        self._launch()
+
+    def _healthy(self):
+        if self._crashed or self._context is None:
+            return False
+        if self._standby is None:
+            return True
+        try:
+            self._standby.evaluate("() => 1")
+            return True
+        except Exception:
+            return False
+
+    def _preload(self):
+        """Mở trang dự phòng + goto target_url trước khi có ai cần"""
+        page = self._standby
+        if page is None or page.is_closed():
+            # Persistent context mở kèm một tab trống -> dùng luôn tab đó
+            blank = [p for p in self._context.pages if p.url == "about:blank"]
+            page = blank[0] if blank else self._context.new_page()
+            page.on("crash", self._on_crash)
+            self._standby = page
+
+        self._standby_url = None
+        self._standby_responses = []
+
+        if not self.target_url:
+            return
+
+        started = time.perf_counter()
+        on_response = self._standby_responses.append
+        page.on("response", on_response)
+        try:
+            page.goto(self.target_url, timeout=PAGE_LOAD_TIMEOUT)
+            page.wait_for_load_state("networkidle")
+            self._standby_url = self.target_url
+            print(f"[Browser] Đã mở sẵn {self.target_url} ({time.perf_counter() - started:.1f}s)")
+        except Exception as e:
+            print(f"[Browser] Không mở sẵn được trang: {e}")
+        finally:
+            page.remove_listener("response", on_response)
+
+    def _ensure_browser(self):
+        if self._context is None:
+            self._launch()
+        elif not self._healthy():
+            self._restart("không phản hồi" if not self._crashed else "crash")
+
+    def _ensure_ready(self):
+        self._ensure_browser()
+
+        if self._standby is None or self._standby.is_closed() or self._standby_url != self.target_url:
+            self._preload()
+
+    def _safe_ready(self):
+        try:
+            self._ensure_ready()
+        except Exception as e:
+            print(f"[Browser] Lỗi khi chuẩn bị browser: {e}")
+            self._shutdown()
+
+    def _lend(self):
+        self._ensure_ready()
+        page, self._standby = self._standby, None
+
+        preloaded = self._standby_url is not None and self._standby_url == self.target_url
+        lease = Lease(page, preloaded, self._standby_responses if preloaded else ())
+        self._standby_responses = []
+        self.leases += 1
+        return lease
+
+    def _lend_scratch(self):
+        """Tab mới cho job tự goto, không đụng tới trang mở sẵn"""
+        self._ensure_browser()
+        page = self._context.new_page()
+        page.on("crash", self._on_crash)
+        self.leases += 1
+        return Lease(page)
+
+    def _give_back(self, lease):
+        """
+        Đóng trang đã dùng (listener của lần crawl đi theo), mở sẵn trang mới ngay.
+        Lease tab riêng: trang mở sẵn vẫn còn -> _safe_ready chỉ kiểm tra sức khỏe, không goto lại.
+        """
+        try:
+            lease.page.close()
+        except Exception:
+            pass
+        self._safe_ready()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_browser_pool():
+    """BrowserPool dùng chung cho cả tiến trình (UI giữ ấm giữa các lần chạy)"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = BrowserPool()
+        return _pool
@@ -0,0 +1,82 @@
+from app.config import CAPTURE_MAX_PENDING
+from app.downloader import save_content
+from app.metrics import metrics
+
+
+class ResponseCapture:
+    """
+    Nghe response ảnh của browser trong lúc render trang,
+    lưu thẳng body vào kho thay vì tải lại URL đó bằng aiohttp.
+    """
+
+    def __init__(self, page, seed=()):
+        """seed: response đã nhận trước khi bắt đầu nghe (trang mở sẵn của BrowserPool)"""
+        self.captured = 0
+        self.missed = 0
+        self.attach(page)
+        for response in seed:
+            self._on_response(response)
+
+    def attach(self, page):
+        """Nghe thêm trang mới (recycle); response chưa dùng của trang cũ được bỏ"""
+        self.responses = {}
+        page.on("response", self._on_response)
+
+    def _on_response(self, response):
+        content_type = response.headers.get("content-type", "")
+        if response.status != 200 or not content_type.startswith("image/"):
+            return
+
+        self.responses[response.url] = response
+
+        # Giới hạn số response chưa dùng tới (ảnh không thuộc item nào)
+        if len(self.responses) > CAPTURE_MAX_PENDING:
+            del self.responses[next(iter(self.responses))]
+
+    def collect(self, items):
+        """
+        Lấy body ảnh browser đã tải (chưa lưu).
+        Trả về ([(item, body, headers)], items browser chưa tải).
+        Tách khỏi store() để thread khác lưu theo đúng thứ tự trang (crawl song song).
+        """
+        captured = []
+        missing = []
+
+        for item in items:
+            response = self.responses.pop(item["url"], None)
+            if response is None:
+                missing.append(item)
+                continue
+
+            try:
+                body = response.body()
+            except Exception:
+                missing.append(item)
+                continue
+
+            captured.append((item, body, response.headers))
+
+        self.captured += len(captured)
+        metrics.inc("capture_images_total", len(captured))
+        self.missed += len(missing)
+
+        print(f"[Capture] Lấy từ browser: {len(captured)}, cần tải: {len(missing)}")
+        return captured, missing
+
+    def store(self, items):
+        """
+        Lưu các item mà browser đã tải.
+        Trả về (records đã lưu, items browser chưa tải -> cần aiohttp).
+        """
+        captured, missing = self.collect(items)
+        return save_captured(captured), missing
+
+
+def save_captured(captured):
+    """Lưu [(item, body, headers)] từ collect() -> records mới (bỏ ảnh trùng)"""
+    records = []
+    for item, body, headers in captured:
+        record = save_content(body, item, headers)
+        if record:
+            records.append(record)
+    return records
@@ -0,0 +1,128 @@
+import os
+import json
+import time
+import threading
+
+from app.config import CHECKPOINT_FILE
+
+
+def load_checkpoint(target_url=None):
+    """Đọc checkpoint lần chạy dở (None nếu không có / hỏng / khác target_url)"""
+    try:
+        with open(CHECKPOINT_FILE, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    if target_url and data.get("target_url") != target_url:
+        return None
+    return data
+
+
+def clear_checkpoint(path=CHECKPOINT_FILE):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+class Checkpoint:
+    """
+    Ghi lại tiến độ sau MỖI trang: trang đã xong, URL + vị trí cuộn của trang đó
+    và các ảnh đã tìm thấy nhưng chưa tải xong (pending).
+    Lần chạy bị dừng / crash / đóng UI -> resume đi tiếp từ trang kế
+    và tải nốt pending trước, không crawl lại từ đầu.
+
+    page_done() gọi từ thread crawl, item_done() từ event loop tải -> dùng lock.
+    """
+
+    def __init__(self, target_url, start_page, end_page, path=CHECKPOINT_FILE):
+        self.path = path
+        self.target_url = target_url
+        self.start_page = start_page
+        self.end_page = end_page
+
+        # Trang cuối cùng đã crawl xong (liên tục từ start_page)
+        self.page = start_page - 1
+        self.url = None
+        self.scroll_y = 0
+        # False = URL không mở thẳng được trang đó (bấm Next kiểu AJAX, URL không đổi)
+        self.direct = True
+        self.pending = {}
+
+        # Vị trí đọc từ checkpoint cũ (chỉ có khi resume)
+        self.position = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def resume(cls, data, end_page=None):
+        """Checkpoint mới tiếp nối checkpoint cũ: crawl từ trang kế tiếp, giữ nguyên pending"""
+        checkpoint = cls(data["target_url"], data["page"] + 1, end_page or data["end_page"])
+        checkpoint.page = data["page"]
+        checkpoint.url = data.get("url")
+        checkpoint.scroll_y = data.get("scroll_y", 0)
+        checkpoint.direct = data.get("direct", True)
+        checkpoint.pending = {item["url"]: item for item in data.get("pending", [])}
+        if checkpoint.url:
+            checkpoint.position = {
+                "page": checkpoint.page,
+                "url": checkpoint.url,
+                "scroll_y": checkpoint.scroll_y,
+                "direct": checkpoint.direct,
+            }
+        return checkpoint
+
+    def pending_items(self):
+        with self._lock:
+            return list(self.pending.values())
+
+    def page_done(self, n, url, items, scroll_y=0, direct=True):
+        """
+        Trang n xong: ghi nhận ảnh chờ tải + vị trí rồi ghi file ngay.
+        direct=False: mở lại url sẽ về nhầm trang -> resume phải bấm Next từ trang 1.
+        """
+        with self._lock:
+            for item in items:
+                self.pending[item["url"]] = item
+            # Chỉ tiến khi liền mạch (trang lỡ thứ tự ở chế độ song song không được nhảy cóc)
+            if n == self.page + 1:
+                self.page = n
+                self.url = url
+                self.scroll_y = scroll_y
+                self.direct = direct
+        self.save()
+
+    def item_done(self, item):
+        """Ảnh đã xử lý xong (đã lưu / trùng / bỏ qua) -> bỏ khỏi pending (ghi file ở lần save sau)"""
+        with self._lock:
+            self.pending.pop(item["url"], None)
+
+    def save(self):
+        with self._lock:
+            data = {
+                "target_url": self.target_url,
+                "start_page": self.start_page,
+                "end_page": self.end_page,
+                "page": self.page,
+                "url": self.url,
+                "scroll_y": self.scroll_y,
+                "direct": self.direct,
+                "pending": list(self.pending.values()),
+                "updated_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            }
+
+            # Ghi file tạm rồi đổi tên -> không bao giờ còn checkpoint ghi dở
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+
+    def close(self, completed):
+        """Chạy trọn vẹn -> xóa checkpoint; dừng giữa chừng / lỗi -> lưu lại để resume"""
+        if completed and not self.pending:
+            clear_checkpoint(self.path)
+            return
+
+        self.save()
+        print(f"[Checkpoint] Đã lưu: xong tới trang {self.page}, còn {len(self.pending)} ảnh chờ tải")
@@ -1,38 +1,33 @@
 import os
-import json
-from app.config import DATA_FILE
-from app.state import remove_hash
+from app.store import get_store
+from app.exporter import log_deletions
+from app.storage import remove_file
 
 
-def delete_image_and_related(image_path):
-    if not os.path.exists(image_path):
-        return False
-
-    # ===== LOAD DATA =====
-    if os.path.exists(DATA_FILE):
-        with open(DATA_FILE, "r", encoding="utf-8") as f:
-            data = json.load(f)
-    else:
-        data = []
+def delete_images(image_paths):
+    """
+    Xóa hàng loạt: tra bản ghi qua index đường dẫn, xóa file,
+    rồi ghi thay đổi vào state + data MỘT lần cho cả lô.
+    Trả về số ảnh đã xóa.
+    """
+    paths = [p for p in set(image_paths) if os.path.exists(p)]
+    if not paths:
+        return 0
 
-    removed_hash = None
-    new_data = []
+    # ===== XÓA BẢN GHI + HASH (MỘT GIAO DỊCH) =====
+    removed = get_store().delete_records_by_paths(paths)
 
-    for item in data:
-        if item.get("local_image_path") == image_path:
-            removed_hash = item.get("hash")
-        else:
-            new_data.append(item)
+    # ===== XÓA FILE ẢNH (+ link view nếu lưu sharded) =====
+    for path in paths:
+        remove_file(path)
+    for record in removed:
+        remove_file(record)
 
-    # ===== XÓA FILE ẢNH =====
-    os.remove(image_path)
+    # ===== GHI LẠI DATA (một lần append) =====
+    log_deletions(paths)
 
-    # ===== GHI LẠI DATA =====
-    with open(DATA_FILE, "w", encoding="utf-8") as f:
-        json.dump(new_data, f, ensure_ascii=False, indent=2)
+    return len(paths)
 
-    # ===== CẬP NHẬT STATE (CHUẨN) =====
-    if removed_hash:
-        remove_hash(removed_hash)
 
-    return True
+def delete_image_and_related(image_path):
+    return delete_images([image_path]) > 0
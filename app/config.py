@@ -7,14 +7,42 @@ if getattr(sys, "frozen", False):
 else:
     BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
+# Cho phép trỏ dữ liệu sang thư mục khác (benchmark, test thủ công)
+BASE_DIR = os.environ.get("TOOLCRAWLER_HOME") or BASE_DIR
+
 # ===== DATA STRUCTURE =====
 DATA_DIR = os.path.join(BASE_DIR, "data")
 
 INFO_DIR = os.path.join(DATA_DIR, "info")
 PICTURE_DIR = os.path.join(DATA_DIR, "picture")
+BLOB_DIR = os.path.join(DATA_DIR, "blobs")
 
 STATE_FILE = os.path.join(INFO_DIR, "state.json")
 DATA_FILE = os.path.join(INFO_DIR, "data.json")
+DATA_LOG_FILE = os.path.join(INFO_DIR, "data.jsonl")
+STATE_DB_FILE = os.path.join(INFO_DIR, "state.db")
+CHECKPOINT_FILE = os.path.join(INFO_DIR, "checkpoint.json")   # tiến độ lần chạy dở (resume)
+
+# ===== METRICS =====
+METRICS_DIR = os.path.join(DATA_DIR, "metrics")
+METRICS_INTERVAL = 10      # giây giữa hai lần ghi metrics.json / metrics.prom
+METRICS_HTTP_PORT = None   # vd 9108 -> bật http://127.0.0.1:9108/metrics
+
+# ===== PROFILING (chỉ khi bật --profile / --trace-memory) =====
+PROFILE_DIR = os.path.join(DATA_DIR, "profile")
+PROFILE_TOP_N = 25         # số dòng cấp phát tăng nhiều nhất ghi cho mỗi trang
+
+# ===== STORAGE =====
+# "sharded": ảnh lưu theo hash ở data/blobs/ab/cd/<hash> (tên STT/title nằm trong bản ghi)
+# "flat": tất cả nằm thẳng trong data/picture (kiểu cũ)
+STORAGE_LAYOUT = "sharded"
+# Góc nhìn tên dễ đọc trong data/picture: "hardlink" / "symlink" / "off".
+# Bật = mỗi ảnh một mục trong data/picture (lại là thư mục phẳng khổng lồ) -> chỉ bật nếu cần duyệt thư mục;
+# UI liệt kê ảnh từ SQLite, không cần view.
+PICTURE_VIEW = "off"
+
+# data.jsonl vượt ngưỡng này -> gộp lại vào data.json (nền)
+DATA_LOG_COMPACT_BYTES = 4 * 1024 * 1024
 
 # đảm bảo tồn tại
 os.makedirs(INFO_DIR, exist_ok=True)
@@ -23,10 +51,85 @@ os.makedirs(PICTURE_DIR, exist_ok=True)
 # ===== CRAWLER =====
 TARGET_URL = "https://buavl.net/"
 HEADLESS = True
+CHROME_PATH = os.environ.get("TOOLCRAWLER_CHROME")  # None = tự tìm
 PAGE_WAIT = 2
 PAGE_LOAD_TIMEOUT = 60000
 NEXT_BUTTON_SELECTOR = "i.fas.fa-chevron-right"
 
+# Browser giữ ấm giữa các lần chạy (UI): profile riêng có disk cache + cookie
+BROWSER_PROFILE_DIR = os.path.join(DATA_DIR, "browser")
+BROWSER_HEALTH_INTERVAL = 30   # giây rảnh giữa hai lần kiểm tra browser còn sống
+
+# Đổi sang tab mới khi chạy lâu (0 = tắt tiêu chí đó); RSS cần psutil
+RECYCLE_EVERY_PAGES = 200
+RECYCLE_JS_HEAP_MB = 512
+RECYCLE_RSS_MB = 2048
+
+# ===== REQUEST ROUTING (bỏ tài nguyên không cần cho việc lấy ảnh) =====
+# "block" = chặn thật, "audit" = chỉ đo phần sẽ chặn, "off" = tắt.
+# block dùng page.route -> Playwright tắt HTTP cache + mọi request đi qua thread Python,
+# mất lợi thế cache đĩa của browser chạy sẵn (BrowserPool) -> chỉ bật cho site nhiều quảng cáo.
+ROUTE_MODE = "audit"
+ROUTE_BLOCK_TYPES = ("font", "media", "manifest")
+# Regex trên URL (quảng cáo / tracker / analytics)
+ROUTE_BLOCK_PATTERNS = [
+    r"doubleclick\.net",
+    r"googlesyndication\.com",
+    r"adservice\.google",
+    r"facebook\.net",
+    r"hotjar\.com",
+    r"/ads?/",
+]
+# Trả về rỗng thay vì chặn (script analytics mà trang có thể chờ)
+ROUTE_STUB_PATTERNS = [
+    r"googletagmanager\.com",
+    r"google-analytics\.com",
+]
+ROUTE_DEFER_IMAGES = True   # tắt capture -> browser không tải ảnh (aiohttp tải sau)
+
+# Incremental: dừng khi gặp K trang liên tiếp chỉ có ảnh đã biết (--incremental)
+INCREMENTAL_STOP_PAGES = 3
+
+# Số browser crawl song song (>1 cần mẫu URL phân trang đã học, xem app/pagination.py)
+CRAWL_TABS = 1
+
+# Lưu ảnh trực tiếp từ response của browser (không tải lại bằng aiohttp)
+CAPTURE_MODE = True
+CAPTURE_MAX_PENDING = 2000
+
+# Chế độ cuộn: thay ảnh đã xử lý bằng khung rỗng cùng kích thước (RAM Chrome không tăng mãi)
+SCROLL_PRUNE_SEEN = False
+
+# ===== WAIT ENGINE (sleep cũ = thời gian chờ tối đa) =====
+WAIT_QUIET = 0.3   # giây không có request ảnh nào -> coi như đã nạp xong
+WAIT_POLL = 0.05
+
 # ===== DOWNLOADER =====
-MAX_CONCURRENT_DOWNLOAD = 5
+MAX_CONCURRENT_DOWNLOAD = 5           # concurrency khởi điểm cho mỗi host
+MAX_CONCURRENT_DOWNLOAD_CEILING = 32  # trần AIMD cho mỗi host
+DOWNLOAD_RETRIES = 2                  # thử lại khi 429/503/timeout
+DOWNLOAD_RETRY_BACKOFF = 1.0          # giây chờ khi không có Retry-After
+THROTTLE_LATENCY_FACTOR = 3.0         # latency > 3x mức tốt nhất -> giảm concurrency
 DOWNLOAD_TIMEOUT = 30
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+IO_WORKERS = 4                        # thread hash + ghi đĩa + SQLite (ngoài event loop)
+LOOP_LAG_INTERVAL = 0.1               # giây giữa hai lần đo độ trễ event loop (0 = tắt)
+
+# Hash nội dung cho kho MỚI: "blake2b" (nhanh) / "sha256" (kiểu cũ).
+# Thuật toán được ghi vào state; kho sha256 có sẵn vẫn giữ sha256.
+HASH_ALGORITHM = "blake2b"
+
+# URL đã biết: "skip" = bỏ qua luôn, "revalidate" = hỏi lại bằng ETag/Last-Modified, "off" = luôn tải
+URL_INDEX_MODE = "skip"
+
+# ===== PIPELINE (crawl -> download chạy song song) =====
+PIPELINE_MODE = True
+PIPELINE_QUEUE_SIZE = 200
+
+# ===== HTTP FAST PATH (trang render sẵn phía server -> không cần Chrome) =====
+HTTP_FAST_PATH = True         # tự chuyển sang Playwright nếu HTML không có ảnh
+HTTP_CRAWL_CONCURRENCY = 4    # số trang HTML tải cùng lúc
+HTTP_USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/124.0 Safari/537.36"
+)
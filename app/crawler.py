@@ -1,7 +1,9 @@
 import argparse
 import time
+import queue
 import asyncio
 import os
+import threading
 
 from playwright.sync_api import sync_playwright, TimeoutError
 
@@ -11,121 +13,135 @@ from app.config import (
     PAGE_WAIT,
     PAGE_LOAD_TIMEOUT,
     NEXT_BUTTON_SELECTOR,
+    MAX_CONCURRENT_DOWNLOAD_CEILING,
+    PIPELINE_MODE,
+    PIPELINE_QUEUE_SIZE,
+    CAPTURE_MODE,
+    CRAWL_TABS,
+    METRICS_HTTP_PORT,
+    ROUTE_MODE,
+    ROUTE_DEFER_IMAGES,
+    HTTP_FAST_PATH,
+    INCREMENTAL_STOP_PAGES,
+    SCROLL_PRUNE_SEEN,
 )
 
-from app.downloader import download_all
-from app.exporter import export_to_json
+from app.browser import BrowserPool, LAUNCH_ARGS, get_chrome_path
+from app.extract import pick_image, renumber
+from app.downloader import download_all, download_queue, open_session
+from app.http_crawl import crawl_http, MISSING_STATUSES
+from app.pagination import load_template, save_template, forget_template, page_url, parse_page_range
+from app.waits import WaitEngine
+from app.capture import ResponseCapture, save_captured
+from app.checkpoint import Checkpoint, load_checkpoint
+from app.incremental import EarlyStop
+from app.recycle import PageRecycler
+from app.storage import ensure_layout
+from app.routing import RoutePolicy
+from app.metrics import metrics, SnapshotWriter, serve_http, append_run_summary
+from app.exporter import flush_data_file
+from app.profiling import Profiler, NULL_PROFILER
 
 
 # =========================
-# PLAYWRIGHT FIX (BẮT BUỘC)
+# CRAWL LOGIC
 # =========================
-# Ép Playwright KHÔNG dùng browser nội bộ
-os.environ["PLAYWRIGHT_BROWSERS_PATH"] = "0"
+# Một lần evaluate lấy các <img> CHƯA xử lý: [thuộc tính, currentSrc, naturalWidth, naturalHeight, complete].
+# Ảnh đã xử lý mang data-tc-seen = chữ ký của thẻ lúc xử lý (mọi thuộc tính trừ data-tc-* + currentSrc)
+# -> trang cuộn vô hạn không quét lại ảnh cũ mỗi lần cuộn, còn thẻ được dùng lại (framework chỉ đổi
+# src / data-src khi chuyển trang AJAX, lazy-load đổi nguồn) có chữ ký khác nên được quét lại.
+# data-tc-kept = ảnh đã lấy.
+# prune=true: ảnh đã lấy (chưa đổi) được thay bằng khung rỗng cùng kích thước (giữ nguyên bố cục).
+IMG_SIGNATURE_JS = """(el) => {
+        let sig = el.currentSrc || "";
+        for (const a of el.attributes) {
+            if (!a.name.startsWith("data-tc-")) sig += "|" + a.name + "=" + a.value;
+        }
+        return sig;
+    }"""
 
+EXTRACT_IMAGES_JS = """(prune) => {
+    const sig = %s;
+    if (prune) {
+        for (const el of document.querySelectorAll("img[data-tc-kept]")) {
+            if (el.dataset.tcSeen !== sig(el)) continue;
+            const box = el.getBoundingClientRect();
+            const ph = document.createElement("div");
+            ph.style.width = box.width + "px";
+            ph.style.height = box.height + "px";
+            el.replaceWith(ph);
+        }
+    }
+    const batch = Array.from(document.images).filter((el) => el.dataset.tcSeen !== sig(el));
+    window.__tcBatch = batch;
+    return batch.map((el) => {
+        const attrs = {};
+        for (const a of el.attributes) if (!a.name.startsWith("data-tc-")) attrs[a.name] = a.value;
+        return [attrs, el.currentSrc || "", el.naturalWidth || 0, el.naturalHeight || 0, el.complete];
+    });
+}""" % IMG_SIGNATURE_JS
 
-def get_chrome_path():
-    """Tự động tìm Chrome trên Windows"""
-    paths = [
-        r"C:\Program Files\Google\Chrome\Application\chrome.exe",
-        r"C:\Program Files (x86)\Google\Chrome\Application\chrome.exe",
-    ]
-    for path in paths:
-        if os.path.exists(path):
-            return path
-    raise FileNotFoundError("❌ Không tìm thấy Google Chrome trên máy")
+# Tab mới mở lại tới vị trí cũ: mọi ảnh đang có đã được xử lý ở tab trước
+SEEN_ALL_JS = """() => {
+    const sig = %s;
+    for (const el of document.images) {
+        el.dataset.tcSeen = sig(el);
+        el.dataset.tcKept = "1";
+    }
+}""" % IMG_SIGNATURE_JS
 
+# Đánh dấu ảnh (theo vị trí trong lần quét vừa rồi) là đã xử lý: [[vị trí, đã lấy?]]
+MARK_SEEN_JS = """(marks) => {
+    const sig = %s;
+    const batch = window.__tcBatch || [];
+    for (const [i, kept] of marks) {
+        const el = batch[i];
+        if (!el) continue;
+        el.dataset.tcSeen = sig(el);
+        if (kept) el.dataset.tcKept = "1";
+        else delete el.dataset.tcKept;
+    }
+    window.__tcBatch = null;
+}""" % IMG_SIGNATURE_JS
 
-# =========================
-# CRAWL LOGIC
-# =========================
-def extract_images(page, start_index=1):
+
+def extract_images(page, start_index=1, waits=None, prune=SCROLL_PRUNE_SEEN):
     """
     Trích xuất ảnh thông minh (Deep Scanning)
-    Quét tất cả các thẻ <img> và các thuộc tính tiềm năng.
+    Quét tất cả các thẻ <img> và các thuộc tính tiềm năng
+    trong MỘT lần gọi evaluate (thay vì một round-trip cho mỗi ảnh).
+    Chỉ trả về ảnh MỚI so với lần gọi trước trên cùng document (chế độ cuộn).
     """
-    # Đợi một chút để ảnh lazy-load kịp hiện diện trong DOM
-    time.sleep(1)
-    
+    # Đợi ảnh lazy-load kịp hiện diện trong DOM (tối đa 1s)
+    if waits:
+        waits.settle_images("extract", 1)
+    else:
+        time.sleep(1)
+
+    started = time.perf_counter()
     results = []
     stt = start_index
-    imgs = page.query_selector_all("img")
     base_url = page.url
 
-    for img in imgs:
-        # Lấy TẤT CẢ thuộc tính của thẻ img để tìm link ảnh
-        all_attrs = page.evaluate('''(el) => {
-            let attrs = {};
-            for (let i = 0; i < el.attributes.length; i++) {
-                attrs[el.attributes[i].name] = el.attributes[i].value;
-            }
-            return attrs;
-        }''', img)
-
-        src = None
-        # Ưu tiên các thuộc tính phổ biến
-        for attr in ["data-src", "data-original", "data-lazy-src", "srcset", "src", "data-lazy"]:
-            if attr in all_attrs and all_attrs[attr]:
-                val = all_attrs[attr]
-                if val.strip().startswith("http") or val.strip().startswith("/") or val.strip().startswith("//"):
-                    src = val
-                    break
-        
-        # Nếu vẫn không thấy, quét sạch toàn bộ thuộc tính tìm link ảnh
-        if not src:
-            for attr_name, attr_val in all_attrs.items():
-                if isinstance(attr_val, str) and (attr_val.endswith((".jpg", ".png", ".jpeg", ".gif", ".webp")) or "http" in attr_val):
-                    src = attr_val
-                    break
-
-        if not src:
-            continue
-            
-        # Xử lý srcset
-        if " " in src and "," in src:
-            src = src.split(",")[0].split(" ")[0]
-        elif " " in src:
-            src = src.split(" ")[0]
-
-        # Bộ lọc rác thông minh
-        img_id = (all_attrs.get("id") or "").lower()
-        img_class = (all_attrs.get("class") or "").lower()
-        alt_text = (all_attrs.get("alt") or "").lower()
-        
-        # Chỉ chặn rác hệ thống thực sự (icon nhỏ, avatar mặc định)
-        is_junk = any(kw in (img_id + img_class + alt_text + src.lower()) 
-                     for kw in ["favicon", "icon-", "tracker", "ads-", "advertisement"])
-
-        if is_junk:
-            continue
+    rows = page.evaluate(EXTRACT_IMAGES_JS, prune)
+    seen = []
+    for index, (all_attrs, current_src, natural_width, natural_height, complete) in enumerate(rows):
+        item = pick_image(all_attrs, base_url, stt, current_src, natural_width, natural_height)
 
-        # Lọc kích thước (Nới lỏng để không mất ảnh meme)
-        try:
-            width = int(all_attrs.get("width") or 0)
-            height = int(all_attrs.get("height") or 0)
-            if (width > 0 and width < 60) or (height > 0 and height < 60):
-                continue
-        except: pass
-
-        # Chuẩn hóa URL
-        if src.startswith("//"):
-            src = "https:" + src
-        elif src.startswith("/"):
-            from urllib.parse import urljoin
-            src = urljoin(base_url, src)
-        elif not src.startswith("http"):
+        if not item:
+            # Bị loại khi đã nạp xong -> chỉ xét lại nếu thẻ đổi (placeholder -> ảnh thật)
+            if complete and natural_width:
+                seen.append([index, False])
             continue
 
-        title = all_attrs.get("alt") or all_attrs.get("title") or f"Image_{stt}"
-        title = title.strip()[:100]
-
-        results.append({
-            "stt": stt,
-            "title": title,
-            "url": src
-        })
+        # Ảnh đã lấy -> không quét lại nữa (trừ khi thẻ đổi src / data-src)
+        seen.append([index, True])
+        results.append(item)
         stt += 1
 
+    if seen:
+        page.evaluate(MARK_SEEN_JS, seen)
+
     # Loại bỏ link trùng lặp
     seen_urls = set()
     unique_results = []
@@ -133,13 +149,18 @@ def extract_images(page, start_index=1):
         if item["url"] not in seen_urls:
             unique_results.append(item)
             seen_urls.add(item["url"])
-            
+
+    metrics.observe("crawl_extract_seconds", time.perf_counter() - started)
+    metrics.inc("crawl_images_found_total", len(unique_results))
+    metrics.inc("crawl_images_filtered_total", len(rows) - len(unique_results))
+
     return unique_results
 
 
-def click_next_or_scroll(page) -> bool:
+def click_next_or_scroll(page, waits=None):
     """
     Thông minh: Tìm nút Tiếp, Xem thêm hoặc Cuộn xuống nếu không có nút.
+    Trả về cách đã chuyển ("click" / "scroll"), None nếu không chuyển được.
     """
     try:
         # 1. Tìm các nút có chữ "Tiếp", "Next", "Xem thêm", "More"
@@ -154,7 +175,7 @@ def click_next_or_scroll(page) -> bool:
             if btn and btn.is_visible() and btn.is_enabled():
                 btn.click()
                 print(f"[Smart] Chuyển trang tiếp theo")
-                return True
+                return "click"
 
         # 2. Nếu không có nút, thử cuộn xuống (Progressive Scroll)
         print("[Smart] Không thấy nút, đang thử cuộn trang bậc thang...")
@@ -164,113 +185,833 @@ def click_next_or_scroll(page) -> bool:
         for i in range(1, 4):
             scroll_to = (previous_height // 3) * i
             page.evaluate(f"window.scrollTo(0, {scroll_to})")
-            time.sleep(1)
+            if waits:
+                waits.settle_images(f"scroll {i}", 1)
+            else:
+                time.sleep(1)
         
-        # Đợi thêm một chút để nội dung mới nạp hẳn
-        time.sleep(2)
+        # Đợi thêm một chút để nội dung mới nạp hẳn (tối đa 2s)
+        if waits:
+            waits.height_grows("scroll height", previous_height, 2)
+        else:
+            time.sleep(2)
         
         new_height = page.evaluate("document.body.scrollHeight")
         if new_height > previous_height:
             print("[Smart] Đã nạp thành công nội dung mới.")
-            return True
+            return "scroll"
             
-        return False
+        return None
 
     except Exception as e:
         print(f"[Smart] Lỗi khi chuyển nội dung: {e}")
-        return False
+        return None
 
 
-def crawl_pages(start_page, end_page, target_url=TARGET_URL, stop_flag=None, progress_callback=None):
-    all_items = []
-    global_stt = 1
+def restore_scroll(page, waits, scroll_y):
+    """Cuộn lại tới scroll_y (trang cuộn vô hạn: cuộn dần để nội dung kịp nạp thêm)"""
+    while True:
+        page.evaluate(f"window.scrollTo(0, {int(scroll_y)})")
+        if page.evaluate("window.scrollY") >= scroll_y - 1:
+            return True
+
+        height = page.evaluate("document.body.scrollHeight")
+        waits.settle_images("resume scroll", 1)
+        if not waits.height_grows("resume scroll", height, 2):
+            print(f"[Checkpoint] Chỉ cuộn lại được tới {page.evaluate('window.scrollY')}/{int(scroll_y)}px")
+            return False
+
+
+def crawl_pages(start_page, end_page, target_url=TARGET_URL, stop_flag=None, progress_callback=None, on_items=None,
+                capture=CAPTURE_MODE, on_captured=None, stats=None, profiler=NULL_PROFILER, browser_pool=None,
+                route_mode=ROUTE_MODE, tabs=CRAWL_TABS, checkpoint=None, early_stop=None):
+    """
+    capture=True: ảnh browser đã tải được lưu ngay (báo qua on_captured),
+    chỉ những item browser chưa tải mới được trả về / đẩy sang on_items.
+    stats (dict): nếu truyền vào sẽ được cộng dồn số trang / số ảnh tìm thấy.
+    profiler: đo riêng giai đoạn extract + snapshot bộ nhớ sau mỗi trang.
+    browser_pool: mượn trang từ BrowserPool đang chạy sẵn thay vì tự mở Chrome.
+    route_mode: "block" / "audit" / "off" (xem RoutePolicy).
+    tabs > 1: chia khoảng trang cho nhiều browser chạy song song (cần mẫu URL đã học).
+    checkpoint: ghi tiến độ sau mỗi trang; checkpoint.position (resume) -> mở lại đúng trang đã dừng.
+    early_stop: EarlyStop (incremental) -> dừng khi gặp đủ số trang liên tiếp toàn ảnh đã biết.
+    """
+    if tabs > 1 and end_page > start_page:
+        template = load_template(target_url)
+        if template:
+            return _crawl_parallel(
+                start_page, end_page, target_url, template, tabs, stop_flag, progress_callback, on_items,
+                capture, on_captured, stats, profiler, route_mode, checkpoint, early_stop,
+            )
+        print("[Tabs] Chưa có mẫu URL phân trang -> crawl tuần tự (chạy một lần để học mẫu)")
 
-    chrome_path = get_chrome_path()
+    def crawl_on(page, preloaded=False, seed=()):
+        recycler = PageRecycler()
+        # Đo trong thread đang điều khiển browser (thread của BrowserPool nếu có)
+        try:
+            with profiler.stage("crawl"):
+                return _crawl_on_page(
+                    page, start_page, end_page, target_url, stop_flag, progress_callback, on_items,
+                    capture, on_captured, stats, profiler, route_mode, checkpoint, early_stop, recycler,
+                    preloaded, seed,
+                )
+        finally:
+            recycler.close()
+
+    if browser_pool:
+        return browser_pool.run(
+            target_url,
+            lambda lease: crawl_on(lease.page, lease.preloaded, lease.responses),
+        )
 
     with sync_playwright() as p:
         browser = p.chromium.launch(
-            executable_path=chrome_path,
+            executable_path=get_chrome_path(),
             headless=HEADLESS,
-            args=[
-                "--disable-blink-features=AutomationControlled",
-                "--disable-infobars",
-                "--no-sandbox",
-            ],
+            args=LAUNCH_ARGS,
         )
+        try:
+            return crawl_on(browser.new_page())
+        finally:
+            browser.close()
 
-        page = browser.new_page()
 
-        print(f"Mở trang: {target_url}")
-        page.goto(target_url, timeout=PAGE_LOAD_TIMEOUT)
+def _crawl_on_page(page, start_page, end_page, target_url, stop_flag, progress_callback, on_items,
+                   capture, on_captured, stats, profiler, route_mode, checkpoint, early_stop, recycler,
+                   preloaded, seed):
+    if stats is None:
+        stats = {}
+    stats.setdefault("pages", 0)
+    stats.setdefault("images_found", 0)
+
+    all_items = []
+    global_stt = 1
+
+    waits = WaitEngine(page)
+    response_capture = ResponseCapture(page, seed) if capture else None
+    # Capture cần body ảnh từ browser -> chỉ hoãn tải ảnh khi tắt capture
+    route_policy = RoutePolicy(
+        target_url, mode=route_mode, defer_images=ROUTE_DEFER_IMAGES and not capture
+    ).attach(page)
+
+    def open_url(url, kind, label):
+        nav_started = time.perf_counter()
+        response = page.goto(url, timeout=PAGE_LOAD_TIMEOUT)
         page.wait_for_load_state("networkidle")
+        load_seconds = time.perf_counter() - nav_started
+        metrics.observe("crawl_navigation_seconds", load_seconds, kind=kind)
+        route_policy.report_page(label, load_seconds)
+        return response is None or response.ok
 
-        # 🔥 NHẢY TỚI START_PAGE
-        current_page = 1
-        while current_page < start_page:
-            if stop_flag and stop_flag():
-                print("[STOP] Đã dừng khi nhảy trang")
-                browser.close()
-                return []
+    current_page = 1
+    template = load_template(target_url)
+
+    # 🔥 ĐÃ BIẾT MẪU URL -> NHẢY THẲNG TỚI START_PAGE
+    if template and start_page > 1:
+        url = page_url(template, target_url, start_page)
+        print(f"[Page] Nhảy thẳng tới trang {start_page}: {url}")
+        preloaded = False
+        if open_url(url, "jump", f"trang {start_page}"):
+            current_page = start_page
+        else:
+            print("[Page] Mẫu URL không còn đúng -> bấm Next từ trang 1")
+            forget_template(target_url)
+            template = None
+
+    # 🔥 RESUME: mở lại trang + vị trí cuộn cuối cùng của lần chạy trước
+    position = checkpoint.position if checkpoint else None
+    resumed = False
+    if current_page == 1 and position and position["page"] < start_page:
+        if not position.get("direct", True):
+            # Bấm Next kiểu AJAX (URL không đổi) -> mở lại URL sẽ về trang 1 chứ không phải trang cũ
+            print(f"[Checkpoint] Trang {position['page']} không có URL riêng -> bấm Next từ trang 1")
+        else:
+            print(f"[Checkpoint] Mở lại trang {position['page']}: {position['url']}")
+            preloaded = False
+            if open_url(position["url"], "resume", f"trang {position['page']}"):
+                if position["scroll_y"]:
+                    restore_scroll(page, waits, position["scroll_y"])
+                # Ảnh tới vị trí này đã xử lý ở lần chạy trước -> lần quét sau chỉ lấy ảnh mới
+                page.evaluate(SEEN_ALL_JS)
+                current_page = position["page"]
+                resumed = True
+            else:
+                print("[Checkpoint] Không mở lại được -> đi từ trang 1")
+
+    if current_page == 1 and not resumed:
+        if preloaded:
+            # Trang đã được BrowserPool mở sẵn -> bỏ qua goto + networkidle
+            print(f"Dùng trang đã mở sẵn: {target_url}")
+        else:
+            print(f"Mở trang: {target_url}")
+            open_url(target_url, "goto", "mở trang")
+
+    # URL từng trang sau khi bấm Next (để học mẫu URL cho lần sau).
+    # Chế độ cuộn không đổi URL -> không ghi.
+    page_urls = {current_page: page.url}
+    last_url = page.url
+
+    def remember_url():
+        nonlocal last_url
+        if page.url != last_url:
+            page_urls[current_page] = last_url = page.url
+
+    # Cách đã chuyển trang kể từ lần mở URL gần nhất ("click" / "scroll")
+    moves = set()
+
+    def recycle(reason):
+        """Đổi sang tab mới rồi mở lại đúng trang hiện tại (URL của trang + vị trí cuộn)"""
+        nonlocal page
+        if template:
+            url, scroll_y = page_url(template, target_url, current_page), 0
+        elif "click" in moves and page_urls.get(current_page) != page.url:
+            # Bấm Next mà URL không đổi (AJAX) -> mở lại URL sẽ về nhầm trang
+            print(f"[Recycle] {reason} nhưng trang {current_page} không có URL riêng -> giữ tab cũ")
+            recycler.postpone()
+            return
+        else:
+            url, scroll_y = page.url, page.evaluate("window.scrollY")
+
+        print(f"[Recycle] {reason} -> mở lại trang {current_page} trên tab mới")
+        page = recycler.new_page(page)
+        waits.attach(page)
+        if response_capture:
+            response_capture.attach(page)
+        route_policy.attach(page)
+
+        if not open_url(url, "recycle", f"mở lại trang {current_page}"):
+            print(f"[Recycle] Mở lại {url} không thành công")
+        if scroll_y:
+            restore_scroll(page, waits, scroll_y)
+        # Ảnh tới vị trí này đã xử lý ở tab cũ -> lần quét sau chỉ lấy ảnh mới
+        page.evaluate(SEEN_ALL_JS)
+        moves.clear()
+
+    # 🔥 CHƯA CÓ MẪU URL -> BẤM NEXT TỚI START_PAGE
+    while current_page < start_page:
+        if stop_flag and stop_flag():
+            print("[STOP] Đã dừng khi nhảy trang")
+            return []
+
+        print(f"Đang bỏ qua TRANG {current_page}")
+        nav_started = time.perf_counter()
+        waits.mark()
+        move = click_next_or_scroll(page, waits)
+        if not move:
+            print("Không thể nhảy tới trang bắt đầu")
+            return []
+        moves.add(move)
+
+        waits.page_changed("next page", PAGE_WAIT)
+        load_seconds = time.perf_counter() - nav_started
+        metrics.observe("crawl_navigation_seconds", load_seconds, kind="skip")
+        waits.report_page(f"bỏ qua trang {current_page}")
+        route_policy.report_page(f"bỏ qua trang {current_page}", load_seconds)
+        current_page += 1
+        remember_url()
+
+    # 🔥 BẮT ĐẦU CRAWL
+    while current_page <= end_page:
+        if stop_flag and stop_flag():
+            print("[STOP] Đã dừng crawl")
+            break
+
+        print(f"\n=== Đang crawl TRANG {current_page} ===")
+
+        # Report progress
+        if progress_callback:
+            progress_callback(current_page, f"Đang crawl trang {current_page}/{end_page}")
+
+        with profiler.stage("extract"):
+            items = extract_images(page, start_index=global_stt, waits=waits)
+        print(f"Tìm thấy {len(items)} ảnh")
+        global_stt += len(items)
+        stats["pages"] += 1
+        stats["images_found"] += len(items)
+        metrics.inc("crawl_pages_total")
+
+        # Incremental: xét ảnh cũ / mới TRƯỚC khi lưu
+        caught_up = early_stop.observe(current_page, items) if early_stop else False
+
+        # Capture: lưu luôn ảnh browser đã tải, phần còn lại mới cần aiohttp
+        if response_capture:
+            records, items = response_capture.store(items)
+            if on_captured and records:
+                on_captured(records)
+
+        all_items.extend(items)
+
+        # Pipeline: đẩy ngay sang downloader
+        if on_items and items:
+            on_items(items)
+
+        if checkpoint:
+            # Bấm Next mà URL không đổi (AJAX) -> URL hiện tại không mở thẳng được trang này
+            direct = bool(template) or not ("click" in moves and page_urls.get(current_page) != page.url)
+            checkpoint.page_done(current_page, page.url, items, page.evaluate("window.scrollY"), direct)
+
+        profiler.page_boundary(f"trang {current_page}")
+
+        if current_page == end_page or caught_up:
+            break
+
+        # Tab chạy quá lâu / tốn bộ nhớ -> sang tab mới trước khi chuyển trang
+        reason = recycler.check(page, f"trang {current_page}")
+        if reason:
+            recycle(reason)
+
+        nav_started = time.perf_counter()
+        waits.mark()
+        move = click_next_or_scroll(page, waits)
+        if not move:
+            print("[!] Không thấy trang tiếp theo hoặc không thể cuộn thêm.")
+            break
+        moves.add(move)
+
+        waits.page_changed("next page", PAGE_WAIT)
+        load_seconds = time.perf_counter() - nav_started
+        metrics.observe("crawl_navigation_seconds", load_seconds, kind="next")
+        waits.report_page(f"trang {current_page}")
+        route_policy.report_page(f"trang {current_page + 1}", load_seconds)
+        current_page += 1
+        remember_url()
+
+    waits.report_page(f"trang {current_page}")
+    waits.report_total()
+    stats["route"] = route_policy.summary()
+    stats["memory"] = recycler.summary()
+    if not template:
+        save_template(target_url, page_urls)
+
+    return all_items
+
+
+def _crawl_parallel(start_page, end_page, target_url, template, tabs, stop_flag, progress_callback, on_items,
+                    capture, on_captured, stats, profiler, route_mode, checkpoint, early_stop):
+    """
+    Mỗi worker là một thread riêng với browser riêng (Playwright sync không dùng chung được giữa các thread),
+    lấy lần lượt số trang kế tiếp, mở thẳng bằng mẫu URL và trích xuất.
+    Kết quả được ghép lại theo đúng thứ tự trang (STT + ảnh capture lưu theo thứ tự trang).
+    """
+    if stats is None:
+        stats = {}
+    stats.setdefault("pages", 0)
+    stats.setdefault("images_found", 0)
+
+    tabs = min(tabs, end_page - start_page + 1)
+    page_numbers = iter(range(start_page, end_page + 1))
+    numbers_lock = threading.Lock()
+    results = queue.Queue()
+    print(f"[Tabs] Crawl song song {tabs} browser: trang {start_page} -> {end_page}")
+
+    def next_number():
+        if (stop_flag and stop_flag()) or (early_stop and early_stop.stopped):
+            return None
+        with numbers_lock:
+            return next(page_numbers, None)
+
+    def worker():
+        try:
+            with sync_playwright() as p:
+                browser = p.chromium.launch(
+                    executable_path=get_chrome_path(),
+                    headless=HEADLESS,
+                    args=LAUNCH_ARGS,
+                )
+                page = browser.new_page()
+                waits = WaitEngine(page)
+                response_capture = ResponseCapture(page) if capture else None
+                route_policy = RoutePolicy(
+                    target_url, mode=route_mode, defer_images=ROUTE_DEFER_IMAGES and not capture
+                ).attach(page)
+                recycler = PageRecycler()
+
+                while (n := next_number()) is not None:
+                    try:
+                        nav_started = time.perf_counter()
+                        page.goto(page_url(template, target_url, n), timeout=PAGE_LOAD_TIMEOUT)
+                        page.wait_for_load_state("networkidle")
+                        metrics.observe("crawl_navigation_seconds", time.perf_counter() - nav_started, kind="tab")
+
+                        with profiler.stage("extract"):
+                            items = extract_images(page, waits=waits)
+                        captured, missing = response_capture.collect(items) if response_capture else ([], items)
+                        results.put((n, items, captured, missing))
+                    except Exception as e:
+                        print(f"[Tabs] Lỗi ở trang {n}: {e}")
+                        # items None = trang lỗi (khác trang không có ảnh)
+                        results.put((n, None, [], []))
+                        if not browser.is_connected():
+                            # Chrome chết -> dừng worker này, không rút cạn các trang còn lại thành "lỗi"
+                            print(f"[Tabs] Browser của {threading.current_thread().name} đã đóng -> dừng worker")
+                            break
+
+                    # Trang nào cũng mở thẳng bằng URL -> đổi tab không cần khôi phục vị trí
+                    reason = recycler.check(page, f"{threading.current_thread().name} trang {n}")
+                    if reason:
+                        print(f"[Recycle] {reason} -> tab mới")
+                        page = recycler.new_page(page)
+                        waits.attach(page)
+                        if response_capture:
+                            response_capture.attach(page)
+                        route_policy.attach(page)
 
-            print(f"Đang bỏ qua TRANG {current_page}")
-            if not click_next_or_scroll(page):
-                print("Không thể nhảy tới trang bắt đầu")
                 browser.close()
-                return []
+        except Exception as e:
+            print(f"[Tabs] Worker dừng vì lỗi: {e}")
+        finally:
+            results.put(None)
 
-            time.sleep(PAGE_WAIT)
-            current_page += 1
+    threads = [threading.Thread(target=worker, name=f"crawl-tab-{i}", daemon=True) for i in range(tabs)]
+    for thread in threads:
+        thread.start()
 
-        # 🔥 BẮT ĐẦU CRAWL
-        while current_page <= end_page:
-            if stop_flag and stop_flag():
-                print("[STOP] Đã dừng crawl")
-                break
+    all_items = []
+    global_stt = 1
+    ready = {}
+    emit = start_page
+    running = tabs
 
-            print(f"\n=== Đang crawl TRANG {current_page} ===")
+    def deliver(n, items, captured, missing):
+        nonlocal global_stt
+        if early_stop and early_stop.stopped:
+            # Trang tải trước khi kịp dừng (incremental) -> bỏ
+            return
+        if items is None:
+            # Trang lỗi: không tính là đã xong, checkpoint giữ lại trước trang này -> resume thử lại
+            print(f"\n=== TRANG {n}: lỗi, bỏ qua ===")
+            stats.setdefault("failed_pages", []).append(n)
+            return
+        print(f"\n=== TRANG {n}: {len(items)} ảnh ===")
+        if progress_callback:
+            progress_callback(n, f"Đang crawl trang {n}/{end_page}")
 
-            # Report progress
-            if progress_callback:
-                progress_callback(current_page, f"Đang crawl trang {current_page}/{end_page}")
+        global_stt = renumber(items, global_stt)
+        stats["pages"] += 1
+        stats["images_found"] += len(items)
+        metrics.inc("crawl_pages_total")
+        if early_stop:
+            early_stop.observe(n, items)
 
-            items = extract_images(page, start_index=global_stt)
-            print(f"Tìm thấy {len(items)} ảnh")
+        records = save_captured(captured)
+        if on_captured and records:
+            on_captured(records)
 
-            all_items.extend(items)
-            global_stt += len(items)
+        all_items.extend(missing)
+        if on_items and missing:
+            on_items(missing)
+        if checkpoint:
+            checkpoint.page_done(n, page_url(template, target_url, n), missing)
+        profiler.page_boundary(f"trang {n}")
 
-            if current_page == end_page:
-                break
+    while running:
+        result = results.get()
+        if result is None:
+            running -= 1
+            continue
 
-            if not click_next_or_scroll(page):
-                print("[!] Không thấy trang tiếp theo hoặc không thể cuộn thêm.")
-                break
+        ready[result[0]] = result[1:]
+        while emit in ready:
+            deliver(emit, *ready.pop(emit))
+            emit += 1
 
-            time.sleep(PAGE_WAIT)
-            current_page += 1
+    # Trang lỡ thứ tự (worker lỗi / dừng giữa chừng): giao nốt theo thứ tự tăng dần
+    for n in sorted(ready):
+        deliver(n, *ready[n])
 
-        browser.close()
+    for thread in threads:
+        thread.join()
 
+    # Mọi worker đã dừng mà còn trang chưa ai nhận -> tính là lỗi (giữ checkpoint để resume)
+    if not ((stop_flag and stop_flag()) or (early_stop and early_stop.stopped)):
+        with numbers_lock:
+            untaken = list(page_numbers)
+        if untaken:
+            print(f"[Tabs] Không còn worker nào chạy, {len(untaken)} trang chưa crawl: {untaken[0]} -> {untaken[-1]}")
+            stats.setdefault("failed_pages", []).extend(untaken)
     return all_items
 
 
-def run_crawler(start_page, end_page, target_url=TARGET_URL, stop_flag=None, progress_callback=None):
-    items = crawl_pages(start_page, end_page, target_url=target_url, stop_flag=stop_flag, progress_callback=progress_callback)
+async def crawl_and_download(start_page, end_page, target_url=TARGET_URL, stop_flag=None, progress_callback=None,
+                             capture=CAPTURE_MODE, on_captured=None, stats=None, profiler=NULL_PROFILER,
+                             browser_pool=None, route_mode=ROUTE_MODE, tabs=CRAWL_TABS, checkpoint=None,
+                             early_stop=None):
+    """
+    Pipeline: crawl chạy trong thread riêng, ảnh tìm được đẩy vào queue
+    có giới hạn và được worker tải ngay trong lúc browser chuyển trang.
+    Queue đầy -> crawl tạm dừng (backpressure).
+    """
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+    workers = MAX_CONCURRENT_DOWNLOAD_CEILING
+    timings = stats.setdefault("timings", {}) if stats is not None else {}
+
+    def on_items(items):
+        for item in items:
+            # Chặn thread crawl khi queue đầy
+            asyncio.run_coroutine_threadsafe(queue.put(item), loop).result()
+        metrics.set_gauge("pipeline_queue_depth", queue.qsize())
+
+    def crawl_timed():
+        started = time.perf_counter()
+        try:
+            return crawl_pages(
+                start_page, end_page,
+                target_url=target_url,
+                stop_flag=stop_flag,
+                progress_callback=progress_callback,
+                on_items=on_items,
+                capture=capture,
+                on_captured=on_captured,
+                stats=stats,
+                profiler=profiler,
+                browser_pool=browser_pool,
+                route_mode=route_mode,
+                tabs=tabs,
+                checkpoint=checkpoint,
+                early_stop=early_stop,
+            )
+        finally:
+            timings["crawl"] = time.perf_counter() - started
+
+    async def crawl():
+        try:
+            return await loop.run_in_executor(None, crawl_timed)
+        finally:
+            for _ in range(workers):
+                await queue.put(None)
+
+    started = time.perf_counter()
+    crawl_task = asyncio.create_task(crawl())
+    with profiler.stage("download"):
+        downloaded_data = await download_queue(
+            queue, workers=workers, stop_flag=stop_flag,
+            on_done=checkpoint.item_done if checkpoint else None,
+        )
+    await crawl_task
+    timings["download"] = time.perf_counter() - started
+
+    return downloaded_data
+
+
+def extract_with_browser(browser_pool, url):
+    """Trích xuất MỘT trang bằng Playwright (trang mà HTTP fast path không thấy ảnh)"""
+    def work(lease):
+        page = lease.page
+        if page.url != url:
+            page.goto(url, timeout=PAGE_LOAD_TIMEOUT)
+            page.wait_for_load_state("networkidle")
+        return extract_images(page, waits=WaitEngine(page))
+
+    return browser_pool.run(None, work)
+
+
+async def http_crawl_and_download(start_page, end_page, target_url=TARGET_URL, stop_flag=None, progress_callback=None,
+                                  stats=None, profiler=NULL_PROFILER, browser_pool=None, checkpoint=None,
+                                  early_stop=None):
+    """
+    HTTP fast path: đọc HTML bằng aiohttp (không render), ảnh đẩy thẳng vào queue tải
+    trên CÙNG session. Trang không có ảnh trong HTML -> Playwright cho riêng trang đó.
+    Trả về (ảnh đã tải, trang đầu tiên chưa crawl được):
+    trang đầu cần JS / hết link phân trang (vd: site cuộn vô hạn) -> phần còn lại do Playwright làm.
+    """
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+    workers = MAX_CONCURRENT_DOWNLOAD_CEILING
+    if stats is None:
+        stats = {}
+    timings = stats.setdefault("timings", {})
+    stats.setdefault("pages", 0)
+    stats.setdefault("images_found", 0)
+
+    # Chỉ mở Chrome khi thật sự có trang cần fallback
+    pool = browser_pool or BrowserPool()
+    next_stt = 1
+
+    async def fallback(url):
+        return await loop.run_in_executor(None, extract_with_browser, pool, url)
+
+    async def on_page(n, items):
+        nonlocal next_stt
+        if early_stop and early_stop.stopped:
+            # Trang tải song song trước khi kịp dừng (incremental) -> bỏ
+            return
+        print(f"\n=== TRANG {n} (HTTP): {len(items)} ảnh ===")
+        if progress_callback:
+            progress_callback(n, f"Đang crawl trang {n}/{end_page}")
+
+        next_stt = renumber(items, next_stt)
+        stats["pages"] += 1
+        stats["images_found"] += len(items)
+        metrics.inc("crawl_pages_total")
+        if early_stop:
+            early_stop.observe(n, items)
+        profiler.page_boundary(f"trang {n}")
+
+        for item in items:
+            await queue.put(item)
+        metrics.set_gauge("pipeline_queue_depth", queue.qsize())
+
+        if checkpoint:
+            checkpoint.page_done(n, known.get(n), items)
+
+    # Đã biết mẫu URL -> mọi trang trong khoảng được tải song song ngay từ đầu
+    template = load_template(target_url)
+    known = {n: page_url(template, target_url, n) for n in range(start_page, end_page + 1)} if template else {}
+    # Resume: đi tiếp từ URL trang đã dừng thay vì lần lại từ trang 1
+    if checkpoint and checkpoint.position:
+        known.setdefault(checkpoint.position["page"], checkpoint.position["url"])
+
+    started = time.perf_counter()
+    try:
+        async with open_session() as session:
+            download_task = asyncio.ensure_future(
+                download_queue(
+                    queue, workers=workers, stop_flag=stop_flag, session=session,
+                    on_done=checkpoint.item_done if checkpoint else None,
+                )
+            )
+            try:
+                pages, failure = await crawl_http(
+                    session, start_page, end_page, target_url, on_page,
+                    stop_flag=lambda: (stop_flag and stop_flag()) or (early_stop and early_stop.stopped),
+                    fallback=fallback,
+                    known=known,
+                )
+            finally:
+                timings["http_crawl"] = time.perf_counter() - started
+                for _ in range(workers):
+                    await queue.put(None)
+
+            with profiler.stage("download"):
+                downloaded_data = await download_task
+    finally:
+        if pool is not browser_pool:
+            await loop.run_in_executor(None, pool.close)
+
+    timings["http_download"] = time.perf_counter() - started
+    if not template:
+        save_template(target_url, known)
+
+    if failure:
+        # 404 = hết trang; lỗi khác -> ghi lại để giữ checkpoint. Cả hai: Playwright không làm tiếp.
+        n, status = failure
+        if status not in MISSING_STATUSES:
+            stats.setdefault("failed_pages", []).append(n)
+        return downloaded_data, end_page + 1
+    return downloaded_data, start_page + (pages or 0)
+
+
+_metrics_server = None
+
+
+def start_metrics_http():
+    """Bật endpoint /metrics một lần cho cả tiến trình (nếu có METRICS_HTTP_PORT)"""
+    global _metrics_server
+    if METRICS_HTTP_PORT and _metrics_server is None:
+        _metrics_server = serve_http(METRICS_HTTP_PORT)
+
+
+def run_crawler(start_page, end_page, target_url=TARGET_URL, stop_flag=None, progress_callback=None,
+                pipeline=PIPELINE_MODE, capture=CAPTURE_MODE, profile=False, trace_memory=False, browser_pool=None,
+                route_mode=ROUTE_MODE, http_fast_path=HTTP_FAST_PATH, tabs=CRAWL_TABS, resume=False, incremental=0):
+    """
+    Chạy crawl + tải + xuất dữ liệu.
+    Trả về summary: số trang, số ảnh, bytes và thời gian từng giai đoạn (giây).
+    Ở chế độ pipeline, "download" tính từ lúc bắt đầu tới khi tải xong (chồng lên "crawl").
+    profile=True: cProfile từng giai đoạn -> data/profile/<thời điểm>/<stage>.pstats
+    trace_memory=True: tracemalloc ở mỗi ranh giới trang -> memory_top.txt
+    browser_pool: BrowserPool đang giữ ấm (UI) -> không phải mở Chrome + trang đầu mỗi lần chạy
+    route_mode: chặn tài nguyên thừa ("block"), chỉ đo ("audit") hoặc tắt ("off")
+    http_fast_path: thử đọc HTML bằng aiohttp trước, chỉ dùng Chrome khi trang cần JS
+    tabs: số browser crawl song song (phần chạy bằng Chrome)
+    resume=True: tiếp tục từ checkpoint của lần chạy dở (bỏ qua start_page; end_page=None -> giữ như cũ),
+    tải nốt ảnh còn chờ trước rồi crawl tiếp từ trang sau trang đã xong
+    incremental=K (>0): chỉ lấy nội dung mới, dừng khi gặp K trang liên tiếp toàn ảnh đã biết
+    """
+    run_started = time.perf_counter()
+
+    checkpoint = None
+    if resume:
+        data = load_checkpoint(target_url)
+        if data:
+            checkpoint = Checkpoint.resume(data, end_page)
+            start_page, end_page = checkpoint.start_page, checkpoint.end_page
+            print(f"[Checkpoint] Tiếp tục từ trang {start_page} -> {end_page}, "
+                  f"{len(checkpoint.pending)} ảnh chờ tải")
+        else:
+            print("[Checkpoint] Không có checkpoint để tiếp tục")
+            if start_page is None or end_page is None:
+                raise ValueError("Không có checkpoint để tiếp tục")
+    if checkpoint is None:
+        checkpoint = Checkpoint(target_url, start_page, end_page)
+
+    summary = {
+        "started_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "target_url": target_url,
+        "start_page": start_page,
+        "end_page": end_page,
+        "pipeline": pipeline,
+        "capture": capture,
+        "route_mode": route_mode,
+        "engine": "browser",
+        "tabs": tabs,
+        "resumed": checkpoint.position is not None or bool(checkpoint.pending),
+        "incremental": incremental,
+        "timings": {},
+    }
+    timings = summary["timings"]
+
+    profiler = Profiler(cpu=profile, memory=trace_memory) if profile or trace_memory else NULL_PROFILER
+    if profiler.enabled:
+        summary["profile_dir"] = profiler.out_dir
+
+    ensure_layout()
+    start_metrics_http()
+    metrics_before = metrics.snapshot()
+    writer = SnapshotWriter().start()
+    early_stop = EarlyStop(target_url, incremental) if incremental else None
+    completed = False
+    try:
+        _run(summary, start_page, end_page, target_url, stop_flag, progress_callback, pipeline, capture, profiler,
+             browser_pool, route_mode, http_fast_path, tabs, checkpoint, early_stop)
+        # Còn trang lỗi -> giữ checkpoint để --resume thử lại
+        completed = not (stop_flag and stop_flag()) and not summary.get("failed_pages")
+        if early_stop:
+            summary["incremental"] = early_stop.finish()
+    finally:
+        checkpoint.close(completed)
+        writer.stop()
+        profiler.finish()
+
+    timings["total"] = time.perf_counter() - run_started
+    summary["metrics"] = metrics.diff(metrics_before, metrics.snapshot())
 
-    if stop_flag and stop_flag():
-        print("[STOP] Dừng trước khi tải ảnh")
-        return
+    append_run_summary(summary)
+    print(f"[Run] {summary['pages']} trang, {summary['images_saved']} ảnh mới, "
+          f"{summary['bytes'] / 1024:.0f} KB trong {timings['total']:.1f}s")
+    return summary
 
-    # Report downloading phase
-    if progress_callback:
-        progress_callback(end_page, "Tải ảnh...")
 
-    downloaded_data = asyncio.run(download_all(items))
+def _run(summary, start_page, end_page, target_url, stop_flag, progress_callback, pipeline, capture, profiler,
+         browser_pool, route_mode, http_fast_path, tabs, checkpoint, early_stop):
+    timings = summary["timings"]
+    summary.setdefault("pages", 0)
+    summary.setdefault("images_found", 0)
 
+    # Ảnh đã lưu thẳng từ browser (capture mode)
+    captured_data = []
+
+    # Resume: tải nốt ảnh lần trước đã tìm thấy nhưng chưa kịp tải
+    pending_data = []
+    pending = checkpoint.pending_items()
+    if pending:
+        print(f"[Checkpoint] Tải nốt {len(pending)} ảnh còn chờ từ lần chạy trước")
+        started = time.perf_counter()
+        with profiler.stage("download"):
+            pending_data = asyncio.run(download_all(pending, on_done=checkpoint.item_done))
+        timings["pending_download"] = time.perf_counter() - started
+
+    http_data = []
+    crawl_from = start_page
+    if http_fast_path and start_page <= end_page:
+        http_data, crawl_from = asyncio.run(
+            http_crawl_and_download(
+                start_page, end_page,
+                target_url=target_url,
+                stop_flag=stop_flag,
+                progress_callback=progress_callback,
+                stats=summary,
+                profiler=profiler,
+                browser_pool=browser_pool,
+                checkpoint=checkpoint,
+                early_stop=early_stop,
+            )
+        )
+        summary["engine"] = "http" if crawl_from > start_page else "browser"
+
+    # Phần HTTP không làm được (trang cần JS / không còn link) -> Playwright
+    browser_needed = crawl_from <= end_page and not (stop_flag and stop_flag())
+    if early_stop and early_stop.stopped:
+        browser_needed = False
+    if http_fast_path and browser_needed:
+        print(f"[HTTP] Từ trang {crawl_from} chuyển sang Playwright")
+        summary["engine"] = "http+browser" if crawl_from > start_page else "browser"
+
+    if not browser_needed:
+        downloaded_data = []
+    elif pipeline:
+        downloaded_data = asyncio.run(
+            crawl_and_download(
+                crawl_from, end_page,
+                target_url=target_url,
+                stop_flag=stop_flag,
+                progress_callback=progress_callback,
+                capture=capture,
+                on_captured=captured_data.extend,
+                stats=summary,
+                profiler=profiler,
+                browser_pool=browser_pool,
+                route_mode=route_mode,
+                tabs=tabs,
+                checkpoint=checkpoint,
+                early_stop=early_stop,
+            )
+        )
+    else:
+        started = time.perf_counter()
+        items = crawl_pages(
+            crawl_from, end_page,
+            target_url=target_url,
+            stop_flag=stop_flag,
+            progress_callback=progress_callback,
+            capture=capture,
+            on_captured=captured_data.extend,
+            stats=summary,
+            profiler=profiler,
+            browser_pool=browser_pool,
+            route_mode=route_mode,
+            tabs=tabs,
+            checkpoint=checkpoint,
+            early_stop=early_stop,
+        )
+        timings["crawl"] = time.perf_counter() - started
+
+        if stop_flag and stop_flag():
+            print("[STOP] Dừng trước khi tải ảnh")
+            items = []
+
+        # Report downloading phase
+        elif progress_callback:
+            progress_callback(end_page, "Tải ảnh...")
+
+        started = time.perf_counter()
+        with profiler.stage("download"):
+            downloaded_data = asyncio.run(download_all(items, on_done=checkpoint.item_done)) if items else []
+        timings["download"] = time.perf_counter() - started
+
+    downloaded_data = pending_data + http_data + downloaded_data
+    summary["images_captured"] = len(captured_data)
+    summary["images_downloaded"] = len(downloaded_data)
+
+    downloaded_data = captured_data + downloaded_data
+    summary["images_saved"] = len(downloaded_data)
+    summary["bytes"] = sum(
+        os.path.getsize(r["local_image_path"])
+        for r in downloaded_data
+        if os.path.exists(r["local_image_path"])
+    )
+
+    # Bản ghi đã vào store + data.jsonl ngay khi từng ảnh được lưu (commit_file)
+    started = time.perf_counter()
     if downloaded_data:
-        export_to_json(downloaded_data)
+        print(f"[OK] Đã ghi {len(downloaded_data)} item ")
     else:
         print("Không có ảnh mới (tất cả đã tồn tại)")
+    with profiler.stage("export"):
+        # data.jsonl đủ lớn -> gộp vào data.json (nền)
+        flush_data_file()
+    timings["export"] = time.perf_counter() - started
 
 
 # =========================
@@ -281,13 +1022,45 @@ if __name__ == "__main__":
         description="Crawler buavl.net (STT + title + image)"
     )
 
-    parser.add_argument("--start", type=int, required=True)
-    parser.add_argument("--end", type=int, required=True)
+    parser.add_argument("--start", type=int)
+    parser.add_argument("--end", type=int)
+    parser.add_argument("--pages", help='Khoảng trang, vd "500-520" (thay cho --start/--end)')
+    parser.add_argument("--no-pipeline", action="store_true", help="Crawl xong hết rồi mới tải ảnh")
+    parser.add_argument("--no-capture", action="store_true", help="Không lấy ảnh từ browser, tải lại tất cả bằng aiohttp")
+    parser.add_argument("--profile", action="store_true", help="cProfile từng giai đoạn (crawl / extract / download / export)")
+    parser.add_argument("--trace-memory", action="store_true", help="tracemalloc: top cấp phát tăng thêm sau mỗi trang")
+    parser.add_argument("--no-http", action="store_true", help="Luôn dùng Chrome, không thử đọc HTML bằng aiohttp")
+    parser.add_argument("--route", choices=["block", "audit", "off"], default=ROUTE_MODE,
+                        help="Chặn font/media/quảng cáo (block), chỉ đo phần sẽ chặn (audit) hoặc tắt")
+    parser.add_argument("--resume", action="store_true",
+                        help="Tiếp tục lần chạy dở từ checkpoint (tải nốt ảnh còn chờ rồi crawl tiếp)")
+    parser.add_argument("--incremental", type=int, nargs="?", const=INCREMENTAL_STOP_PAGES, default=0, metavar="K",
+                        help=f"Chỉ lấy nội dung mới: dừng khi gặp K trang liên tiếp toàn ảnh đã biết (mặc định {INCREMENTAL_STOP_PAGES})")
+    parser.add_argument("--tabs", type=int, default=CRAWL_TABS,
+                        help="Số browser crawl song song (cần mẫu URL phân trang đã học)")
 
     args = parser.parse_args()
 
-    if args.start < 1 or args.start > args.end:
+    try:
+        start, end = parse_page_range(args.pages) if args.pages else (args.start, args.end)
+    except ValueError as e:
+        parser.error(str(e))
+    if (start is None or end is None) and not (args.resume and load_checkpoint(TARGET_URL)):
+        parser.error("cần --pages hoặc cả --start và --end (hoặc --resume khi có checkpoint)")
+
+    if start is not None and end is not None and (start < 1 or start > end):
         print("Trang không hợp lệ")
         exit(1)
 
-    run_crawler(args.start, args.end)
\ No newline at end of file
+    run_crawler(
+        start, end,
+        pipeline=not args.no_pipeline,
+        capture=not args.no_capture,
+        profile=args.profile,
+        trace_memory=args.trace_memory,
+        route_mode=args.route,
+        http_fast_path=not args.no_http,
+        tabs=max(1, args.tabs),
+        resume=args.resume,
+        incremental=args.incremental,
+    )
\ No newline at end of file
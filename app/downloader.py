@@ -1,13 +1,31 @@
 import os
 import re
+import time
 import aiohttp
 import asyncio
-import hashlib
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
 from urllib.parse import urlparse
 
-from app.config import PICTURE_DIR, MAX_CONCURRENT_DOWNLOAD, DOWNLOAD_TIMEOUT
+from app.config import (
+    MAX_CONCURRENT_DOWNLOAD_CEILING,
+    DOWNLOAD_TIMEOUT,
+    DOWNLOAD_RETRIES,
+    DOWNLOAD_RETRY_BACKOFF,
+    DOWNLOAD_CHUNK_SIZE,
+    URL_INDEX_MODE,
+    HTTP_USER_AGENT,
+    IO_WORKERS,
+    LOOP_LAG_INTERVAL,
+)
 
-from app.state import has_hash, add_hash_and_inc_stt
+from app.state import has_hash, claim_record, get_url_info, remember_url
+from app.storage import temp_dir, plan_location, place_file
+from app.store import get_store
+from app.exporter import log_records
+from app.hashing import compute_hash, new_hasher, format_digest
+from app.throttle import AdaptiveThrottle, RETRY_STATUSES, parse_retry_after
+from app.metrics import metrics
 
 
 def safe_filename(text, max_len=100):
@@ -21,57 +39,335 @@ def filename_from_item(item):
     return f"{item['stt']:03d}_{title}{ext}"
 
 
-def compute_hash(content: bytes) -> str:
-    return hashlib.sha256(content).hexdigest()
+# =========================
+# IO POOL (hash + ghi đĩa + SQLite ngoài event loop)
+# =========================
+# Event loop chỉ lo mạng: một ảnh lớn hash / ghi đĩa / chờ giao dịch SQLite
+# không còn chặn các lượt tải khác đang chạy.
+_io_pool = None
 
 
-async def download_one(session, item):
-    os.makedirs(PICTURE_DIR, exist_ok=True)
+def io_pool():
+    global _io_pool
+    if _io_pool is None:
+        _io_pool = ThreadPoolExecutor(max_workers=IO_WORKERS, thread_name_prefix="download-io")
+    return _io_pool
 
-    async with session.get(item["url"], timeout=DOWNLOAD_TIMEOUT) as resp:
-        if resp.status != 200:
-            return None
 
-        content = await resp.read()
-        image_hash = compute_hash(content)
+async def run_io(func, *args):
+    return await asyncio.get_running_loop().run_in_executor(io_pool(), func, *args)
 
-        if has_hash(image_hash):
-            return None
 
-        # 🔥 LẤY STT TOÀN CỤC
-        stt = add_hash_and_inc_stt(image_hash)
+class LoopLagMonitor:
+    """
+    Đo độ trễ event loop: sleep(interval) thức dậy muộn bao lâu = loop bị chặn bấy lâu.
+    Ghi vào histogram event_loop_lag_seconds, in mức tối đa khi dừng.
+    """
 
-        title = safe_filename(item["title"])
-        ext = os.path.splitext(urlparse(item["url"]).path)[1] or ".jpg"
-        filename = f"{stt:03d}_{title}{ext}"
+    def __init__(self, interval=LOOP_LAG_INTERVAL):
+        self.interval = interval
+        self.samples = 0
+        self.total = 0.0
+        self.peak = 0.0
+        self._task = None
 
-        path = os.path.join(PICTURE_DIR, filename)
+    def start(self):
+        if self.interval:
+            self._task = asyncio.ensure_future(self._run())
+        return self
 
-        with open(path, "wb") as f:
-            f.write(content)
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - started - self.interval)
+            metrics.observe("event_loop_lag_seconds", lag)
+            self.samples += 1
+            self.total += lag
+            self.peak = max(self.peak, lag)
 
+    def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        if self.samples:
+            print(
+                f"[Loop] Độ trễ event loop: tối đa {self.peak * 1000:.1f} ms, "
+                f"trung bình {self.total / self.samples * 1000:.1f} ms ({self.samples} mẫu)"
+            )
+
+
+def commit_file(tmp_path, image_hash, item):
+    """
+    Chốt file tạm đã hash xong: cấp STT + ghi bản ghi (cùng giao dịch) rồi chuyển vào kho
+    (PICTURE_DIR hoặc blob sharded). Trùng hash -> xóa file tạm, trả về None.
+    """
+    title = safe_filename(item["title"])
+    ext = os.path.splitext(urlparse(item["url"]).path)[1] or ".jpg"
+
+    names = {}
+
+    def make_record(stt):
+        names["filename"] = filename = f"{stt:03d}_{title}{ext}"
         return {
             "stt": stt,
             "title": item["title"],
-            "local_image_path": path,
             "hash": image_hash,
+            **plan_location(image_hash, filename),
         }
 
-async def download_all(items):
+    # 🔥 LẤY STT TOÀN CỤC + GHI BẢN GHI (None = hash đã tồn tại)
+    record = claim_record(image_hash, make_record)
+    if record is None:
+        os.remove(tmp_path)
+        metrics.inc("download_dedup_total")
+        return None
+
+    location = place_file(tmp_path, image_hash, names["filename"])
+    if any(record.get(key) != value for key, value in location.items()):
+        # vd: không tạo được link view -> sửa lại bản ghi cho đúng thực tế
+        record.update(location)
+        get_store().add_records([record])
+
+    log_records([record])
+    metrics.inc("download_saved_total")
+    return record
+
+
+def save_content(content, item, headers=None):
+    """Lưu bytes ảnh đã có sẵn (vd: browser đã tải) với cùng sổ sách STT/hash"""
+    image_hash = compute_hash(content)
+    headers = headers or {}
+    remember_url(item["url"], image_hash, headers.get("etag"), headers.get("last-modified"), len(content))
+
+    if has_hash(image_hash):
+        return None
+
+    fd, tmp_path = tempfile.mkstemp(prefix=".tmp_", suffix=".part", dir=temp_dir())
+    with os.fdopen(fd, "wb") as f:
+        f.write(content)
+
+    return commit_file(tmp_path, image_hash, item)
+
+
+def open_temp():
+    """File tạm + hasher (lần đầu đọc meta SQLite -> không chạy trên loop)"""
+    hasher = new_hasher()
+    fd, tmp_path = tempfile.mkstemp(prefix=".tmp_", suffix=".part", dir=temp_dir())
+    return os.fdopen(fd, "wb"), tmp_path, hasher
+
+
+def write_chunk(f, hasher, chunk):
+    hasher.update(chunk)
+    f.write(chunk)
+
+
+def known_url(url):
+    """Bản ghi URL index nếu ảnh của URL đó vẫn còn trong kho, ngược lại None"""
+    known = get_url_info(url)
+    return known if known and has_hash(known["hash"]) else None
+
+
+async def stream_to_temp(resp):
+    """
+    Stream body -> file tạm (cùng ổ với kho ảnh), hash theo từng chunk.
+    Loop chỉ nhận chunk; hash + ghi đĩa chạy trong IO pool.
+    """
+    size = 0
+    f, tmp_path, hasher = await run_io(open_temp)
+    try:
+        async for chunk in resp.content.iter_chunked(DOWNLOAD_CHUNK_SIZE):
+            await run_io(write_chunk, f, hasher, chunk)
+            size += len(chunk)
+        await run_io(f.close)
+    except BaseException:
+        f.close()
+        os.remove(tmp_path)
+        raise
+
+    return tmp_path, format_digest(hasher), size
+
+
+async def download_one(session, item, throttle=None):
+    url = item["url"]
+    headers = {}
+
+    # ===== URL INDEX: bỏ qua / hỏi lại ảnh đã biết TRƯỚC khi tải =====
+    if URL_INDEX_MODE != "off":
+        known = await run_io(known_url, url)
+        if known:
+            if URL_INDEX_MODE == "skip":
+                metrics.inc("download_skipped_total", reason="known_url")
+                return None
+            if known["etag"]:
+                headers["If-None-Match"] = known["etag"]
+            if known["last_modified"]:
+                headers["If-Modified-Since"] = known["last_modified"]
+
+    limiter = throttle.limiter(url) if throttle else None
+
+    for attempt in range(DOWNLOAD_RETRIES + 1):
+        if attempt:
+            # Lỗi riêng lẻ (không có Retry-After) -> chỉ request này lùi lại, không chặn cả host
+            await asyncio.sleep(DOWNLOAD_RETRY_BACKOFF * attempt)
+
+        if limiter:
+            await limiter.acquire()
+
+        started = time.monotonic()
+        # (status, size, retry_after) báo lại cho limiter; status None = lỗi mạng
+        outcome = (None, 0, None)
+        # Thời gian tới khi có header (TTFB): không phụ thuộc kích thước ảnh -> dùng cho limiter
+        first_byte = None
+        try:
+            async with session.get(url, timeout=DOWNLOAD_TIMEOUT, headers=headers) as resp:
+                first_byte = time.monotonic() - started
+                if resp.status in RETRY_STATUSES:
+                    outcome = (resp.status, 0, parse_retry_after(resp.headers.get("Retry-After")))
+                    continue
+
+                outcome = (resp.status, 0, None)
+                if resp.status == 304:
+                    # Not Modified -> ảnh không đổi, không tải lại
+                    metrics.inc("download_skipped_total", reason="not_modified")
+                    return None
+                if resp.status != 200:
+                    return None
+
+                tmp_path, image_hash, size = await stream_to_temp(resp)
+                outcome = (200, size, None)
+                await run_io(
+                    remember_url, url, image_hash, resp.headers.get("ETag"), resp.headers.get("Last-Modified"), size
+                )
+
+        except (asyncio.TimeoutError, aiohttp.ClientError):
+            metrics.inc("download_errors_total")
+            if attempt == DOWNLOAD_RETRIES:
+                raise
+            continue
+
+        finally:
+            status, size, retry_after = outcome
+            latency = time.monotonic() - started
+            metrics.observe("download_latency_seconds", latency)
+            metrics.inc("download_requests_total", status=status or "error")
+            metrics.inc("download_bytes_total", size)
+            if limiter:
+                await limiter.release(status, size, latency if first_byte is None else first_byte, retry_after)
+
+        return await run_io(commit_file, tmp_path, image_hash, item)
+
+    # Hết lượt thử mà server vẫn trả 429/503
+    return None
+
+
+async def download_coalesced(session, item, inflight, throttle=None):
+    """
+    Gộp các task cùng URL trong một lần chạy thành MỘT lần tải.
+    Task đến sau chỉ chờ kết quả (ảnh trùng nên không tạo bản ghi mới).
+    """
+    url = item["url"]
+    if url in inflight:
+        await inflight[url]
+        return None
+
+    task = asyncio.ensure_future(download_one(session, item, throttle))
+    inflight[url] = task
+    return await task
+
+
+def make_connector():
+    # Tổng số kết nối do AdaptiveThrottle điều tiết theo từng host
+    return aiohttp.TCPConnector(limit=0, limit_per_host=MAX_CONCURRENT_DOWNLOAD_CEILING)
+
+
+def open_session():
+    """Session aiohttp dùng chung cho tải ảnh + crawl HTML (pool kết nối, UA giống browser)"""
+    return aiohttp.ClientSession(
+        connector=make_connector(),
+        timeout=aiohttp.ClientTimeout(total=DOWNLOAD_TIMEOUT),
+        headers={"User-Agent": HTTP_USER_AGENT},
+    )
+
+
+async def download_all(items, on_done=None):
+    """
+    on_done(item): gọi khi ảnh đã xử lý xong (lưu / trùng / bỏ qua), không gọi khi lỗi
+    (ảnh lỗi còn trong pending của checkpoint -> resume tải lại).
+    """
     results = []
 
-    timeout = aiohttp.ClientTimeout(total=DOWNLOAD_TIMEOUT)   # ✅ thêm
-    connector = aiohttp.TCPConnector(limit=MAX_CONCURRENT_DOWNLOAD)
+    async def download(session, item, inflight, throttle):
+        r = await download_coalesced(session, item, inflight, throttle)
+        if on_done:
+            on_done(item)
+        return r
+
+    lag = LoopLagMonitor().start()
+    async with open_session() as session:
+        inflight = {}
+        throttle = AdaptiveThrottle()
+        tasks = [download(session, item, inflight, throttle) for item in items]
+        try:
+            # Một URL lỗi không được làm hỏng cả lô (ảnh đã lưu vẫn phải được trả về)
+            completed = await asyncio.gather(*tasks, return_exceptions=True)
+        finally:
+            lag.stop()
 
-    async with aiohttp.ClientSession(
-        connector=connector,
-        timeout=timeout
-    ) as session:
-        tasks = [download_one(session, item) for item in items]
-        completed = await asyncio.gather(*tasks)
+    throttle.report()
 
-    for r in completed:
-        if r:
+    for item, r in zip(items, completed):
+        if isinstance(r, Exception):
+            print(f"[!] Lỗi tải {item['url']}: {r}")
+        elif r:
             results.append(r)
 
-    return results
\ No newline at end of file
+    return results
+
+
+async def download_queue(queue, workers=MAX_CONCURRENT_DOWNLOAD_CEILING, stop_flag=None, session=None,
+                         on_done=None):
+    """
+    Worker pool tải ảnh từ asyncio.Queue (chế độ pipeline).
+    Mỗi worker dừng khi nhận None.
+    session: dùng chung session có sẵn (vd: HTTP fast path), None = tự mở.
+    on_done(item): như download_all (ảnh bị bỏ vì dừng giữa chừng cũng không tính là xong).
+    """
+    if session is None:
+        async with open_session() as session:
+            return await download_queue(queue, workers, stop_flag, session, on_done)
+
+    results = []
+
+    inflight = {}
+    throttle = AdaptiveThrottle()
+
+    async def worker():
+        while True:
+            item = await queue.get()
+            metrics.set_gauge("pipeline_queue_depth", queue.qsize())
+            try:
+                if item is None:
+                    return
+                if stop_flag and stop_flag():
+                    continue
+
+                r = await download_coalesced(session, item, inflight, throttle)
+                if on_done:
+                    on_done(item)
+                if r:
+                    results.append(r)
+            except Exception as e:
+                print(f"[!] Lỗi tải {item['url']}: {e}")
+            finally:
+                queue.task_done()
+
+    lag = LoopLagMonitor().start()
+    try:
+        await asyncio.gather(*(worker() for _ in range(workers)))
+    finally:
+        lag.stop()
+
+    throttle.report()
+    return results
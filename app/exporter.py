@@ -1,29 +1,83 @@
 import json
 import os
-from app.config import DATA_FILE, INFO_DIR
+import threading
+from app.config import DATA_FILE, DATA_LOG_FILE, DATA_LOG_COMPACT_BYTES, INFO_DIR
+from app.store import get_store
 
 
-def export_to_json(items):
+# Bản ghi nằm trong SQLite (UI / cleanup đọc thẳng từ store).
+# Bản xuất cho bên ngoài = data.json (snapshot) + data.jsonl (thay đổi sau snapshot, append-only):
+# mỗi lần ghi chỉ tốn O(số item mới); data.jsonl đủ lớn -> gộp lại vào data.json (nền),
+# hoặc gộp theo yêu cầu: python -m app.exporter
+
+# Giữ log + snapshot nhất quán giữa append và compaction
+_log_lock = threading.Lock()
+_compact_thread = None
+
+
+def _append_log(entries):
     os.makedirs(INFO_DIR, exist_ok=True)
 
-    # load cũ
-    if os.path.exists(DATA_FILE):
-        try:
-            with open(DATA_FILE, "r", encoding="utf-8") as f:
-                old_items = json.load(f)
-                if not isinstance(old_items, list):
-                    old_items = []
-        except Exception:
-            old_items = []
-    else:
-        old_items = []
-
-    # append + sort
-    old_items.extend(items)
-    old_items.sort(key=lambda x: x.get("stt", 0))
-
-    # ghi lại
-    with open(DATA_FILE, "w", encoding="utf-8") as f:
-        json.dump(old_items, f, ensure_ascii=False, indent=2)
+    # một lần ghi có buffer cho cả lô
+    lines = "".join(json.dumps(e, ensure_ascii=False) + "\n" for e in entries)
+    with _log_lock:
+        with open(DATA_LOG_FILE, "a", encoding="utf-8") as f:
+            f.write(lines)
+
+
+def log_records(records):
+    """Bản ghi đã nằm trong store (vd: commit_file) -> chỉ append vào data.jsonl"""
+    _append_log({"op": "add", "item": record} for record in records)
+
+
+def export_to_json(items):
+    store = get_store()
+
+    # ghi bản ghi mới vào store (một giao dịch)
+    store.add_records(items)
+
+    # append vào data.jsonl: chi phí O(số item mới)
+    log_records(items)
 
     print(f"[OK] Đã ghi {len(items)} item ")
+
+
+def log_deletions(paths):
+    _append_log({"op": "del", "path": path} for path in paths)
+
+
+def compact_data_log():
+    """Dựng lại data.json (sort theo stt) từ store rồi làm rỗng data.jsonl"""
+    with _log_lock:
+        get_store().write_snapshot(DATA_FILE)
+        with open(DATA_LOG_FILE, "w", encoding="utf-8"):
+            pass
+
+
+def flush_data_file():
+    """
+    Gọi cuối mỗi lần chạy / sau khi xóa ảnh: thay đổi đã nằm trong data.jsonl,
+    chỉ compaction (trong thread nền) khi data.jsonl đủ lớn -> không tốn O(toàn bộ lịch sử) mỗi lần.
+    """
+    global _compact_thread
+
+    try:
+        size = os.path.getsize(DATA_LOG_FILE)
+    except OSError:
+        return
+
+    if size < DATA_LOG_COMPACT_BYTES:
+        return
+    if _compact_thread and _compact_thread.is_alive():
+        return
+
+    _compact_thread = threading.Thread(target=compact_data_log, name="data-compaction")
+    _compact_thread.start()
+
+
+# =========================
+# CLI: compaction theo yêu cầu
+# =========================
+if __name__ == "__main__":
+    compact_data_log()
+    print(f"[OK] Đã gộp data.jsonl vào {DATA_FILE}")
@@ -0,0 +1,93 @@
+from urllib.parse import urljoin
+
+
+# Bộ lọc dùng chung cho mọi engine (Playwright / HTTP)
+IMAGE_ATTR_PRIORITY = ["data-src", "data-original", "data-lazy-src", "srcset", "src", "data-lazy"]
+IMAGE_EXTENSIONS = (".jpg", ".png", ".jpeg", ".gif", ".webp")
+JUNK_KEYWORDS = ["favicon", "icon-", "tracker", "ads-", "advertisement"]
+MIN_IMAGE_SIZE = 60
+
+
+def pick_image(all_attrs, base_url, stt, current_src="", natural_width=0, natural_height=0):
+    """
+    Chọn link ảnh từ thuộc tính của một thẻ <img> + lọc rác / kích thước.
+    Trả về item {stt, title, url} hoặc None.
+    """
+    src = None
+    # Ưu tiên các thuộc tính phổ biến
+    for attr in IMAGE_ATTR_PRIORITY:
+        if attr in all_attrs and all_attrs[attr]:
+            val = all_attrs[attr]
+            if val.strip().startswith("http") or val.strip().startswith("/") or val.strip().startswith("//"):
+                src = val
+                break
+
+    # Nếu vẫn không thấy, quét sạch toàn bộ thuộc tính tìm link ảnh
+    if not src:
+        for attr_name, attr_val in all_attrs.items():
+            if isinstance(attr_val, str) and (attr_val.endswith(IMAGE_EXTENSIONS) or "http" in attr_val):
+                src = attr_val
+                break
+
+    # Cuối cùng: link browser đã chọn (srcset/picture đã resolve)
+    if not src and current_src:
+        src = current_src
+
+    if not src:
+        return None
+
+    # Xử lý srcset
+    if " " in src and "," in src:
+        src = src.split(",")[0].split(" ")[0]
+    elif " " in src:
+        src = src.split(" ")[0]
+
+    # Bộ lọc rác thông minh
+    img_id = (all_attrs.get("id") or "").lower()
+    img_class = (all_attrs.get("class") or "").lower()
+    alt_text = (all_attrs.get("alt") or "").lower()
+
+    # Chỉ chặn rác hệ thống thực sự (icon nhỏ, avatar mặc định)
+    is_junk = any(kw in (img_id + img_class + alt_text + src.lower())
+                  for kw in JUNK_KEYWORDS)
+
+    if is_junk:
+        return None
+
+    # Lọc kích thước (Nới lỏng để không mất ảnh meme)
+    # Không có width/height trong HTML -> dùng kích thước thật, nhưng CHỈ khi browser đã nạp
+    # đúng link được chọn (lazy-load: src là placeholder 1x1, ảnh thật nằm ở data-src)
+    try:
+        width = int(all_attrs.get("width") or 0)
+        height = int(all_attrs.get("height") or 0)
+        if not width and not height and current_src and urljoin(base_url, src) == current_src:
+            width, height = natural_width, natural_height
+        if (width > 0 and width < MIN_IMAGE_SIZE) or (height > 0 and height < MIN_IMAGE_SIZE):
+            return None
+    except: pass
+
+    # Chuẩn hóa URL
+    if src.startswith("//"):
+        src = "https:" + src
+    elif src.startswith("/"):
+        src = urljoin(base_url, src)
+    elif not src.startswith("http"):
+        return None
+
+    title = all_attrs.get("alt") or all_attrs.get("title") or f"Image_{stt}"
+    title = title.strip()[:100]
+
+    return {
+        "stt": stt,
+        "title": title,
+        "url": src
+    }
+
+
+def renumber(items, start):
+    """Đánh lại STT tạm (khi ghép kết quả theo thứ tự trang), sửa luôn title mặc định Image_<stt>"""
+    for stt, item in enumerate(items, start):
+        if item["title"] == f"Image_{item['stt']}":
+            item["title"] = f"Image_{stt}"
+        item["stt"] = stt
+    return start + len(items)
@@ -0,0 +1,76 @@
+import hashlib
+import threading
+
+from app.config import HASH_ALGORITHM, DOWNLOAD_CHUNK_SIZE
+from app.state import get_meta, set_meta, get_last_stt
+
+
+# =========================
+# HASH NỘI DUNG ẢNH
+# =========================
+# sha256 (kiểu cũ) -> "<hex>"; thuật toán khác -> "blake2b:<hex>"
+# => hash nào cũng tự ghi rõ thuật toán, kho sha256 cũ không phải hash lại.
+
+ALGORITHMS = {
+    "sha256": hashlib.sha256,
+    # digest 32 byte: cùng độ dài hex với sha256, nhanh hơn đáng kể trên CPU 64-bit
+    "blake2b": lambda: hashlib.blake2b(digest_size=32),
+}
+
+
+# Meta "hash_algorithm" không đổi trong suốt đời kho (reset cũng giữ lại)
+# -> chỉ đọc SQLite một lần mỗi tiến trình
+_active = None
+_active_lock = threading.Lock()
+
+
+def active_algorithm():
+    """
+    Thuật toán của kho hiện tại, ghi trong meta "hash_algorithm" ở lần dùng đầu tiên.
+    Kho cũ (đã có ảnh, chưa ghi meta) giữ sha256 để dedup theo nội dung vẫn khớp;
+    kho mới dùng HASH_ALGORITHM.
+    """
+    global _active
+
+    if _active is not None:
+        return _active
+
+    with _active_lock:
+        if _active is None:
+            algorithm = get_meta("hash_algorithm")
+            if algorithm is None:
+                algorithm = "sha256" if get_last_stt() else HASH_ALGORITHM
+                set_meta("hash_algorithm", algorithm)
+
+            if algorithm not in ALGORITHMS:
+                raise ValueError(f"Thuật toán hash không hỗ trợ: {algorithm}")
+            _active = algorithm
+    return _active
+
+
+def new_hasher():
+    return ALGORITHMS[active_algorithm()]()
+
+
+def format_digest(hasher):
+    digest = hasher.hexdigest()
+    return digest if hasher.name == "sha256" else f"{hasher.name}:{digest}"
+
+
+def digest_hex(image_hash):
+    """Phần hex của hash (bỏ tiền tố thuật toán) -> dùng làm tên file blob"""
+    return image_hash.rpartition(":")[2]
+
+
+def compute_hash(content: bytes) -> str:
+    hasher = new_hasher()
+    hasher.update(content)
+    return format_digest(hasher)
+
+
+def file_hash(path):
+    hasher = new_hasher()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(DOWNLOAD_CHUNK_SIZE), b""):
+            hasher.update(chunk)
+    return format_digest(hasher)
@@ -0,0 +1,233 @@
+import re
+import time
+import asyncio
+import aiohttp
+from html.parser import HTMLParser
+from urllib.parse import urljoin, urlparse
+
+from app.config import HTTP_CRAWL_CONCURRENCY
+from app.extract import pick_image
+from app.metrics import metrics
+
+
+# Chữ trên link "trang tiếp" (giống danh sách nút của click_next_or_scroll)
+NEXT_TEXTS = {"trang tiếp", "trang sau", "next", "next page", "›", "»", ">"}
+NEXT_ICON_RE = re.compile(r"\bfa-chevron-right\b|\bnext-icon\b")
+
+# Trang không tồn tại -> hết khoảng trang (không phải lỗi, không cần Playwright)
+MISSING_STATUSES = (404, 410)
+
+
+class PageParser(HTMLParser):
+    """
+    Đọc HTML thô (không chạy JS): thuộc tính mọi thẻ <img>,
+    link "trang tiếp" và các link số trang (1, 2, 3...).
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.images = []
+        self.next_href = None
+        self.numbered = {}
+
+        self._anchor = None   # [href, text, is_next]
+
+    def handle_starttag(self, tag, attrs):
+        attrs = {k: v or "" for k, v in attrs}
+
+        if tag == "img":
+            self.images.append(attrs)
+
+        elif tag == "link" and "next" in attrs.get("rel", "").split() and attrs.get("href"):
+            self.next_href = self.next_href or attrs["href"]
+
+        elif tag == "a" and attrs.get("href"):
+            classes = attrs.get("class", "")
+            is_next = "next" in attrs.get("rel", "").split() or "next" in classes.split()
+            self._anchor = [attrs["href"], "", is_next]
+
+        elif self._anchor and tag in ("i", "span") and NEXT_ICON_RE.search(attrs.get("class", "")):
+            self._anchor[2] = True
+
+    def handle_data(self, data):
+        if self._anchor:
+            self._anchor[1] += data
+
+    def handle_endtag(self, tag):
+        if tag != "a" or not self._anchor:
+            return
+
+        href, text, is_next = self._anchor
+        self._anchor = None
+        text = text.strip()
+
+        if is_next or text.lower() in NEXT_TEXTS:
+            self.next_href = self.next_href or href
+        elif text.isdigit() and text in href:
+            # Link số trang: chữ số phải có trong URL (tránh nhầm với số bình luận...)
+            self.numbered.setdefault(int(text), href)
+
+
+def parse_page(html, base_url):
+    """
+    HTML -> (items, next_url, {số trang: url}).
+    Cùng bộ lọc pick_image với extract_images; STT đánh lại khi ghép theo thứ tự trang.
+    """
+    started = time.perf_counter()
+    parser = PageParser()
+    parser.feed(html)
+    parser.close()
+
+    items = []
+    seen_urls = set()
+    for attrs in parser.images:
+        item = pick_image(attrs, base_url, 0)
+        if item and item["url"] not in seen_urls:
+            seen_urls.add(item["url"])
+            items.append(item)
+
+    host = urlparse(base_url).hostname
+
+    def same_site(href):
+        url = urljoin(base_url, href)
+        return url if urlparse(url).hostname == host and url != base_url else None
+
+    next_url = same_site(parser.next_href) if parser.next_href else None
+    numbered = {n: url for n, url in ((n, same_site(h)) for n, h in parser.numbered.items()) if url}
+
+    metrics.observe("crawl_extract_seconds", time.perf_counter() - started)
+    metrics.inc("crawl_images_found_total", len(items))
+    metrics.inc("crawl_images_filtered_total", len(parser.images) - len(items))
+    return items, next_url, numbered
+
+
+async def fetch_html(session, url):
+    """
+    GET một trang HTML, trả về (html, url cuối sau redirect, status).
+    html None khi không phải trang 200 HTML; status None = lỗi mạng / timeout.
+    """
+    try:
+        async with session.get(url) as resp:
+            content_type = resp.headers.get("Content-Type", "")
+            if resp.status != 200 or "html" not in content_type:
+                return None, url, resp.status
+            return await resp.text(errors="replace"), str(resp.url), resp.status
+    except (asyncio.TimeoutError, aiohttp.ClientError) as e:
+        print(f"[HTTP] Lỗi tải {url}: {e}")
+        return None, url, None
+
+
+async def crawl_http(session, start_page, end_page, target_url, on_page, stop_flag=None, fallback=None,
+                     known=None, concurrency=HTTP_CRAWL_CONCURRENCY):
+    """
+    Crawl không cần browser: tải HTML, lấy ảnh + link phân trang.
+    Mọi trang đã biết URL (link "tiếp" + link số trang) được tải song song,
+    kết quả vẫn giao cho on_page(n, items) đúng thứ tự trang.
+
+    fallback(url) -> items: trang 200 có HTML nhưng không thấy ảnh (ảnh do JS dựng) -> nhờ Playwright.
+    Trang 404/410 = hết khoảng trang; 5xx / timeout = lỗi. Cả hai đều dừng crawl ở trang đó, không mở Chrome.
+    known: {số trang: url} biết trước (vd: từ mẫu URL) -> tải thẳng, không cần đi qua các trang trước;
+    sau khi chạy chứa mọi link phân trang tìm được.
+    Trả về (số trang đã xử lý, (trang, status) nơi đã dừng vì 404 / lỗi hoặc None).
+    Số trang None nếu trang đầu không dùng được (site cần JS).
+    """
+    if known is None:
+        known = {}
+    known.setdefault(1, target_url)
+    started_pages = set()
+    ready = {}
+    failed = {}
+    tasks = {}
+    emit = start_page
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def load(n):
+        url = known[n]
+        async with semaphore:
+            html, final_url, status = await fetch_html(session, url)
+
+        items, next_url, numbered = parse_page(html, final_url) if html else ([], None, {})
+        if n == 1 and not items and not next_url and not numbered:
+            # Trang đầu lỗi / không có ảnh lẫn link -> site dựng bằng JS
+            return False, [], None, {}, status
+
+        if html is None:
+            # 404 / 5xx / timeout: không phải "trang cần JS" -> không nhờ Playwright
+            return True, None, None, {}, status
+
+        # Trang trước start_page chỉ dùng để tìm link, không cần ảnh
+        if n >= start_page and not items and fallback:
+            print(f"[HTTP] Trang {n}: không thấy ảnh trong HTML -> dùng Playwright")
+            metrics.inc("crawl_http_fallback_total")
+            try:
+                items = await fallback(url)
+            except Exception as e:
+                print(f"[HTTP] Playwright lỗi ở trang {n}: {e}")
+                items = []
+
+        return True, items, next_url, numbered, status
+
+    def next_batch():
+        wanted = [n for n in known if start_page <= n <= end_page and n not in started_pages]
+        # Chưa biết URL của start_page -> đi tiếp từ trang xa nhất đã biết phía trước nó
+        if start_page not in known:
+            below = [n for n in known if n < start_page]
+            if below and max(below) not in started_pages:
+                wanted.append(max(below))
+        return sorted(wanted)[:concurrency * 2 - len(tasks)]
+
+    while True:
+        if stop_flag and stop_flag():
+            print("[STOP] Đã dừng crawl (HTTP)")
+            break
+
+        for n in next_batch():
+            started_pages.add(n)
+            tasks[asyncio.ensure_future(load(n))] = n
+
+        if not tasks:
+            break
+
+        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            n = tasks.pop(task)
+            usable, items, next_url, numbered, status = task.result()
+
+            if n == 1 and not usable:
+                # Không đọc được trang đầu bằng HTTP -> để Playwright lo toàn bộ
+                return None, None
+
+            if items is None:
+                failed[n] = status
+                continue
+
+            if next_url:
+                known.setdefault(n + 1, next_url)
+            for number, url in numbered.items():
+                known.setdefault(number, url)
+
+            if n >= start_page:
+                ready[n] = items
+
+        # Giao kết quả theo đúng thứ tự trang (STT ổn định)
+        while emit in ready:
+            await on_page(emit, ready.pop(emit))
+            emit += 1
+
+        if emit in failed:
+            break
+
+    for task in tasks:
+        task.cancel()
+
+    if emit in failed:
+        status = failed[emit]
+        if status in MISSING_STATUSES:
+            print(f"[HTTP] Trang {emit}: HTTP {status} -> hết trang, dừng ở trang {emit - 1}")
+        else:
+            print(f"[HTTP] Trang {emit}: {f'HTTP {status}' if status else 'lỗi mạng'} -> dừng, --resume để thử lại")
+        return emit - start_page, (emit, status)
+
+    if emit <= end_page and not (stop_flag and stop_flag()):
+        print(f"[HTTP] Không tìm thấy link tới trang {emit}, dừng ở trang {emit - 1}")
+    return emit - start_page, None
@@ -0,0 +1,95 @@
+import json
+import time
+
+from app.config import INCREMENTAL_STOP_PAGES
+from app.state import get_url_info, has_hash, get_meta, set_meta
+from app.metrics import metrics
+
+
+def is_known(item):
+    """Ảnh đã có trong lịch sử: URL đã từng tải VÀ hash của nó vẫn còn trong kho"""
+    info = get_url_info(item["url"])
+    return bool(info and info["hash"] and has_hash(info["hash"]))
+
+
+class EarlyStop:
+    """
+    Chế độ incremental ("chỉ lấy nội dung mới"): crawl từ trang đầu và dừng sớm
+    khi gặp stop_pages trang LIÊN TIẾP chỉ toàn ảnh đã biết.
+
+    Mốc (watermark) của mỗi lần chạy được lưu trong meta: ảnh mới nhất đã thấy
+    và trang bắt đầu gặp nội dung cũ -> lần sau in ra để so sánh.
+    observe() phải gọi TRƯỚC khi lưu / tải ảnh của trang (lưu xong thì ảnh nào cũng "đã biết").
+    """
+
+    def __init__(self, target_url, stop_pages=INCREMENTAL_STOP_PAGES):
+        self.key = f"watermark:{target_url}"
+        self.stop_pages = stop_pages
+        self.stopped = False
+
+        self.streak = 0
+        self.known_from = None
+        self.new_pages = 0
+        self.new_images = 0
+        self.newest_url = None
+
+        previous = get_meta(self.key)
+        self.previous = json.loads(previous) if previous else None
+        if self.previous:
+            known_from = self.previous["known_from"]
+            print(f"[Incremental] Mốc lần trước ({self.previous['at']}): ảnh mới nhất {self.previous['newest_url']}, "
+                  + (f"nội dung cũ bắt đầu từ trang {known_from}" if known_from else "toàn bộ là nội dung mới"))
+        else:
+            print("[Incremental] Chưa có mốc lần trước")
+
+    def observe(self, n, items):
+        """
+        Ghi nhận trang n; trả về True khi đủ stop_pages trang cũ liên tiếp -> dừng crawl.
+        Chỉ trang có ít nhất một ảnh (và toàn ảnh đã biết) mới được tính vào chuỗi.
+        """
+        if self.newest_url is None and items:
+            self.newest_url = items[0]["url"]
+
+        if self.previous and any(item["url"] == self.previous["newest_url"] for item in items):
+            print(f"[Incremental] Gặp mốc lần trước ở trang {n}")
+
+        if not items:
+            # Trang lỗi / hết trang / không có ảnh -> không phải bằng chứng "toàn ảnh cũ"
+            return self.stopped
+
+        new_items = [item for item in items if not is_known(item)]
+        if new_items:
+            self.streak = 0
+            self.known_from = None
+            self.new_pages += 1
+            self.new_images += len(new_items)
+            return False
+
+        self.streak += 1
+        if self.known_from is None:
+            self.known_from = n
+
+        if self.streak >= self.stop_pages:
+            self.stopped = True
+            metrics.inc("crawl_incremental_stop_total")
+            print(f"[Incremental] {self.streak} trang liên tiếp không có ảnh mới -> dừng ở trang {n}")
+        return self.stopped
+
+    def finish(self):
+        """Lưu mốc lần này, trả về tóm tắt cho run summary"""
+        result = {
+            "stop_pages": self.stop_pages,
+            "stopped_early": self.stopped,
+            "known_from": self.known_from,
+            "new_pages": self.new_pages,
+            "new_images": self.new_images,
+            "previous": self.previous,
+        }
+
+        if self.newest_url:
+            set_meta(self.key, json.dumps({
+                "newest_url": self.newest_url,
+                "known_from": self.known_from,
+                "at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            }))
+        return result
@@ -0,0 +1,262 @@
+import os
+import json
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from app.config import METRICS_DIR, METRICS_INTERVAL
+
+
+# Bucket (giây) dùng chung cho mọi histogram thời gian
+TIME_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+HELP = {
+    "crawl_pages_total": "Số trang đã trích xuất",
+    "crawl_navigation_seconds": "Thời gian chuyển trang (click/cuộn + chờ)",
+    "crawl_wait_seconds": "Thời gian từng lần chờ của WaitEngine",
+    "crawl_extract_seconds": "Thời gian extract_images mỗi trang",
+    "crawl_images_found_total": "Ảnh hợp lệ tìm thấy",
+    "crawl_images_filtered_total": "Thẻ <img> bị loại (rác / quá nhỏ / không có link / trùng)",
+    "capture_images_total": "Ảnh lấy từ response của browser",
+    "crawl_http_fallback_total": "Trang HTTP fast path phải nhờ Playwright (HTML không có ảnh)",
+    "crawl_incremental_stop_total": "Lần chạy incremental dừng sớm vì gặp toàn ảnh đã biết",
+    "download_latency_seconds": "Thời gian một request tải ảnh",
+    "download_bytes_total": "Bytes ảnh đã tải bằng aiohttp",
+    "download_requests_total": "Request tải ảnh theo status",
+    "download_skipped_total": "Ảnh bỏ qua trước khi tải (URL đã biết / 304)",
+    "download_dedup_total": "Ảnh tải xong nhưng trùng hash",
+    "download_saved_total": "Ảnh mới đã lưu",
+    "download_errors_total": "Lỗi mạng khi tải",
+    "state_write_seconds": "Thời gian một giao dịch ghi state",
+    "event_loop_lag_seconds": "Độ trễ event loop của downloader (sleep thức dậy muộn bao lâu)",
+    "pipeline_queue_depth": "Số item đang chờ trong queue pipeline",
+    "route_blocked_total": "Request bị chặn / stub (audit: sẽ bị chặn) theo loại tài nguyên",
+    "route_blocked_bytes_total": "Bytes của request sẽ bị chặn (đo ở chế độ audit)",
+    "browser_js_heap_bytes": "JS heap đang dùng của tab crawl (CDP Performance.getMetrics)",
+    "browser_rss_bytes": "Tổng RSS các process Chrome (cần psutil)",
+    "browser_recycles_total": "Số lần đổi sang tab mới để giải phóng bộ nhớ",
+}
+
+
+def _key(name, labels):
+    return (name, tuple(sorted(labels.items())) if labels else ())
+
+
+def _format_labels(labels, extra=None):
+    pairs = list(labels) + (list(extra.items()) if extra else [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in pairs) + "}"
+
+
+class Histogram:
+    def __init__(self, buckets=TIME_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 6),
+            "avg": round(self.sum / self.count, 6) if self.count else 0.0,
+            "buckets": dict(zip(map(str, self.buckets), self.counts)),
+        }
+
+
+class Registry:
+    """Counter / gauge / histogram trong bộ nhớ, an toàn giữa các thread"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters = {}
+        self.gauges = {}
+        self.histograms = {}
+
+    def inc(self, name, value=1, **labels):
+        key = _key(name, labels)
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def set_gauge(self, name, value, **labels):
+        key = _key(name, labels)
+        with self._lock:
+            self.gauges[key] = value
+
+    def observe(self, name, value, **labels):
+        key = _key(name, labels)
+        with self._lock:
+            hist = self.histograms.get(key)
+            if hist is None:
+                hist = self.histograms[key] = Histogram()
+            hist.observe(value)
+
+    # =========================
+    # EXPORT
+    # =========================
+    def snapshot(self):
+        def name_of(key):
+            name, labels = key
+            return name + _format_labels(labels)
+
+        with self._lock:
+            return {
+                "timestamp": time.time(),
+                "counters": {name_of(k): v for k, v in self.counters.items()},
+                "gauges": {name_of(k): v for k, v in self.gauges.items()},
+                "histograms": {name_of(k): h.to_dict() for k, h in self.histograms.items()},
+            }
+
+    def to_prometheus(self):
+        lines = []
+        typed = set()
+
+        def header(name, kind):
+            if name in typed:
+                return
+            typed.add(name)
+            if name in HELP:
+                lines.append(f"# HELP toolcrawler_{name} {HELP[name]}")
+            lines.append(f"# TYPE toolcrawler_{name} {kind}")
+
+        with self._lock:
+            for (name, labels), value in sorted(self.counters.items()):
+                header(name, "counter")
+                lines.append(f"toolcrawler_{name}{_format_labels(labels)} {value}")
+
+            for (name, labels), value in sorted(self.gauges.items()):
+                header(name, "gauge")
+                lines.append(f"toolcrawler_{name}{_format_labels(labels)} {value}")
+
+            for (name, labels), hist in sorted(self.histograms.items()):
+                header(name, "histogram")
+                cumulative = 0
+                for bound, count in zip(hist.buckets, hist.counts):
+                    cumulative += count
+                    lines.append(f"toolcrawler_{name}_bucket{_format_labels(labels, {'le': bound})} {cumulative}")
+                lines.append(f"toolcrawler_{name}_bucket{_format_labels(labels, {'le': '+Inf'})} {hist.count}")
+                lines.append(f"toolcrawler_{name}_sum{_format_labels(labels)} {hist.sum}")
+                lines.append(f"toolcrawler_{name}_count{_format_labels(labels)} {hist.count}")
+
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def diff(before, after):
+        """Chênh lệch giữa hai snapshot (dùng cho tổng kết từng lần chạy)"""
+        counters = {
+            k: v - before["counters"].get(k, 0)
+            for k, v in after["counters"].items()
+            if v != before["counters"].get(k, 0)
+        }
+
+        histograms = {}
+        for k, h in after["histograms"].items():
+            old = before["histograms"].get(k, {"count": 0, "sum": 0.0})
+            count = h["count"] - old["count"]
+            if count:
+                total = h["sum"] - old["sum"]
+                histograms[k] = {"count": count, "sum": round(total, 6), "avg": round(total / count, 6)}
+
+        return {"counters": counters, "histograms": histograms}
+
+    def write_files(self, directory=METRICS_DIR):
+        """Ghi metrics.json + metrics.prom (ghi file tạm rồi thay thế)"""
+        os.makedirs(directory, exist_ok=True)
+        for filename, content in (
+            ("metrics.json", json.dumps(self.snapshot(), ensure_ascii=False, indent=2)),
+            ("metrics.prom", self.to_prometheus()),
+        ):
+            path = os.path.join(directory, filename)
+            with open(path + ".tmp", "w", encoding="utf-8") as f:
+                f.write(content)
+            os.replace(path + ".tmp", path)
+
+
+metrics = Registry()
+
+
+# =========================
+# PERIODIC SNAPSHOT
+# =========================
+class SnapshotWriter:
+    """Thread nền ghi metrics ra file mỗi METRICS_INTERVAL giây"""
+
+    def __init__(self, registry=metrics, interval=METRICS_INTERVAL, directory=METRICS_DIR):
+        self.registry = registry
+        self.interval = interval
+        self.directory = directory
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="metrics-writer", daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.registry.write_files(self.directory)
+            except OSError as e:
+                print(f"[Metrics] Lỗi ghi snapshot: {e}")
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+        self.registry.write_files(self.directory)
+
+
+# =========================
+# HTTP ENDPOINT
+# =========================
+def serve_http(port, registry=metrics, host="127.0.0.1"):
+    """
+    /metrics      -> Prometheus text
+    /metrics.json -> snapshot JSON
+    Chạy trong thread nền, trả về server (gọi .shutdown() để dừng).
+    """
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def do_GET(self):
+            if self.path == "/metrics":
+                body = registry.to_prometheus().encode("utf-8")
+                content_type = "text/plain; version=0.0.4; charset=utf-8"
+            elif self.path == "/metrics.json":
+                body = json.dumps(registry.snapshot(), ensure_ascii=False).encode("utf-8")
+                content_type = "application/json"
+            else:
+                self.send_response(404)
+                self.end_headers()
+                return
+
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    print(f"[Metrics] http://{host}:{port}/metrics")
+    return server
+
+
+def append_run_summary(summary, directory=METRICS_DIR):
+    """Mỗi lần run_crawler: thêm một dòng JSON vào runs.jsonl"""
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, "runs.jsonl"), "a", encoding="utf-8") as f:
+        f.write(json.dumps(summary, ensure_ascii=False) + "\n")
@@ -0,0 +1,81 @@
+import re
+
+from app.state import get_meta, set_meta
+
+
+# Vị trí số trang trong mẫu URL
+PLACEHOLDER = "{page}"
+
+# Chữ đứng ngay trước số trang: ?page=N, &paged=N, /page/N, /trang-N, ?p=N ...
+# Khóa phải đứng riêng: "/shop/2" không được tính là "p/2"
+PAGE_KEY_RE = re.compile(r"(?<![a-z])(?:page|paged|pg|p|trang)[=/\-_]?$", re.IGNORECASE)
+
+
+def learn_template(page_urls):
+    """
+    Học mẫu URL phân trang từ các URL đã biết {số trang: url} (trang >= 2).
+    Trả về mẫu dạng ".../page/{page}" khớp với MỌI mẫu quan sát được, hoặc None.
+    Chỉ có một mẫu: chỉ nhận số đứng sau khóa phân trang ("page=", "/p/"...);
+    số không tên (vd: "/post-2") cần ít nhất hai mẫu mới đủ tin để nhảy trang.
+    """
+    samples = sorted((n, url) for n, url in page_urls.items() if n >= 2 and url)
+    if not samples:
+        return None
+
+    first_n, first_url = samples[0]
+    candidates = []
+    for match in re.finditer(r"\d+", first_url):
+        if int(match.group()) != first_n:
+            continue
+
+        template = first_url[:match.start()] + PLACEHOLDER + first_url[match.end():]
+        if all(template.replace(PLACEHOLDER, str(n)) == url for n, url in samples):
+            # Ưu tiên số đứng sau "page=" / "/page/"..., sau đó tới số nằm cuối URL
+            named = bool(PAGE_KEY_RE.search(first_url[:match.start()]))
+            if not named and len(samples) < 2:
+                continue
+            candidates.append(((named, match.start()), template))
+
+    if not candidates:
+        return None
+    return max(candidates)[1]
+
+
+def page_url(template, target_url, n):
+    """URL của trang n (trang 1 luôn là target_url)"""
+    if n <= 1 or not template:
+        return target_url
+    return template.replace(PLACEHOLDER, str(n))
+
+
+def _key(target_url):
+    return f"page_template:{target_url}"
+
+
+def load_template(target_url):
+    return get_meta(_key(target_url)) or None
+
+
+def save_template(target_url, page_urls):
+    """Học + lưu mẫu URL (nếu học được). Trả về mẫu mới hoặc None."""
+    template = learn_template(page_urls)
+    if template and template != load_template(target_url):
+        set_meta(_key(target_url), template)
+        print(f"[Page] Đã học mẫu URL phân trang: {template}")
+    return template
+
+
+def forget_template(target_url):
+    set_meta(_key(target_url), "")
+
+
+def parse_page_range(text):
+    """Khoảng trang "500-520" / "500" -> (500, 520) / (500, 500); sai định dạng -> ValueError"""
+    parts = [p.strip() for p in text.split("-")]
+    if len(parts) == 1:
+        start = end = int(parts[0])
+    elif len(parts) == 2:
+        start, end = int(parts[0]), int(parts[1])
+    else:
+        raise ValueError(f"Khoảng trang không hợp lệ: {text}")
+    return start, end
@@ -0,0 +1,119 @@
+import os
+import time
+import cProfile
+import pstats
+import threading
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+
+from app.config import PROFILE_DIR, PROFILE_TOP_N
+
+
+_NULL_CONTEXT = nullcontext()
+
+
+class Profiler:
+    """
+    Profiling bật theo yêu cầu cho run_crawler:
+    - cpu=True: cProfile riêng cho từng giai đoạn (crawl / extract / download / export) -> <stage>.pstats
+    - memory=True: tracemalloc snapshot ở mỗi ranh giới trang -> top-N chênh lệch cấp phát
+    Khi tắt cả hai, stage()/page_boundary() gần như không tốn gì.
+    """
+
+    def __init__(self, cpu=False, memory=False, out_dir=PROFILE_DIR, top_n=PROFILE_TOP_N):
+        self.cpu = cpu
+        self.memory = memory
+        self.enabled = cpu or memory
+        self.top_n = top_n
+        self.out_dir = os.path.join(out_dir, time.strftime("%Y%m%d-%H%M%S")) if self.enabled else out_dir
+
+        self._profiles = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+        self._last_snapshot = None
+        self._memory_log = []
+
+        if self.memory:
+            tracemalloc.start()
+            self._last_snapshot = tracemalloc.take_snapshot()
+
+    # =========================
+    # CPU
+    # =========================
+    def stage(self, name):
+        if not self.cpu:
+            return _NULL_CONTEXT
+        return self._stage(name)
+
+    @contextmanager
+    def _stage(self, name):
+        # cProfile chỉ đo thread hiện tại và không lồng được:
+        # tạm tắt profiler của stage ngoài, bật lại khi stage trong kết thúc
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+
+        with self._lock:
+            profile = self._profiles.setdefault((name, threading.get_ident()), cProfile.Profile())
+
+        if stack:
+            stack[-1].disable()
+        stack.append(profile)
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            stack.pop()
+            if stack:
+                stack[-1].enable()
+
+    # =========================
+    # MEMORY
+    # =========================
+    def page_boundary(self, label):
+        if not self.memory:
+            return
+
+        snapshot = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        diff = snapshot.compare_to(self._last_snapshot, "lineno")[:self.top_n]
+        self._last_snapshot = snapshot
+
+        lines = [f"=== {label} | hiện tại {current / 1024:.0f} KB, đỉnh {peak / 1024:.0f} KB ==="]
+        lines.extend(str(stat) for stat in diff)
+        self._memory_log.append("\n".join(lines))
+
+    # =========================
+    # OUTPUT
+    # =========================
+    def finish(self):
+        if not self.enabled:
+            return
+
+        os.makedirs(self.out_dir, exist_ok=True)
+
+        if self.cpu:
+            # Gộp các thread của cùng một stage vào một file .pstats
+            by_stage = {}
+            for (name, _), profile in self._profiles.items():
+                by_stage.setdefault(name, []).append(profile)
+
+            for name, profiles in by_stage.items():
+                stats = pstats.Stats(profiles[0])
+                for profile in profiles[1:]:
+                    stats.add(profile)
+                stats.dump_stats(os.path.join(self.out_dir, f"{name}.pstats"))
+
+        if self.memory:
+            self.page_boundary("kết thúc")
+            tracemalloc.stop()
+            with open(os.path.join(self.out_dir, "memory_top.txt"), "w", encoding="utf-8") as f:
+                f.write("\n\n".join(self._memory_log) + "\n")
+
+        print(f"[Profile] Đã ghi kết quả vào {self.out_dir}")
+
+
+# Mặc định: không profiling
+NULL_PROFILER = Profiler()
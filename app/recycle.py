@@ -0,0 +1,141 @@
+from app.config import RECYCLE_EVERY_PAGES, RECYCLE_JS_HEAP_MB, RECYCLE_RSS_MB
+from app.metrics import metrics
+
+# RSS của Chrome cần psutil (không bắt buộc): thiếu thì chỉ đo JS heap
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+
+MB = 1024 * 1024
+CHROME_PROCESS_NAMES = ("chrome", "chromium", "headless_shell")
+
+
+def chrome_rss_mb():
+    """Tổng RSS (MB) các process Chrome con của tiến trình này, None nếu không đo được"""
+    if psutil is None:
+        return None
+    total = 0
+    try:
+        for proc in psutil.Process().children(recursive=True):
+            try:
+                if any(name in proc.name().lower() for name in CHROME_PROCESS_NAMES):
+                    total += proc.memory_info().rss
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                continue
+    except psutil.Error:
+        return None
+    return total / MB
+
+
+class PageRecycler:
+    """
+    Đổi sang tab mới sau every trang, hoặc khi JS heap / RSS của Chrome vượt ngưỡng
+    (renderer chạy hàng nghìn trang liền sẽ phình bộ nhớ tới mức chậm hoặc crash).
+    Ngưỡng 0 / None = tắt tiêu chí đó. Việc khôi phục vị trí do crawler lo.
+
+    Chỉ dùng trong thread đang giữ page (Playwright sync).
+    """
+
+    def __init__(self, every=RECYCLE_EVERY_PAGES, heap_mb=RECYCLE_JS_HEAP_MB, rss_mb=RECYCLE_RSS_MB):
+        self.every = every
+        self.heap_mb = heap_mb
+        self.rss_mb = rss_mb
+
+        self.pages = 0        # số trang trên tab hiện tại
+        self.recycles = 0
+        self.peak_heap_mb = 0.0
+        self.peak_rss_mb = 0.0
+
+        self._cdp = None
+        self._cdp_page = None
+        self._opened = []     # tab do recycler mở (đóng khi crawl xong)
+
+    # =========================
+    # ĐO BỘ NHỚ
+    # =========================
+    def reading(self, page):
+        """{"js_heap_mb", "nodes", "rss_mb"} (giá trị None nếu không đo được)"""
+        heap_mb = nodes = None
+        try:
+            if self._cdp_page is not page:
+                self._cdp = page.context.new_cdp_session(page)
+                self._cdp.send("Performance.enable")
+                self._cdp_page = page
+            values = {m["name"]: m["value"] for m in self._cdp.send("Performance.getMetrics")["metrics"]}
+            heap_mb = values.get("JSHeapUsedSize", 0) / MB
+            nodes = int(values.get("Nodes", 0))
+        except Exception:
+            self._cdp = self._cdp_page = None
+
+        return {"js_heap_mb": heap_mb, "nodes": nodes, "rss_mb": chrome_rss_mb()}
+
+    def check(self, page, label):
+        """
+        Gọi sau mỗi trang: đo + in bộ nhớ vào log.
+        Trả về lý do cần đổi tab, hoặc None.
+        """
+        self.pages += 1
+        reading = self.reading(page)
+        heap_mb, rss_mb = reading["js_heap_mb"], reading["rss_mb"]
+
+        parts = []
+        if heap_mb is not None:
+            self.peak_heap_mb = max(self.peak_heap_mb, heap_mb)
+            metrics.set_gauge("browser_js_heap_bytes", int(heap_mb * MB))
+            parts.append(f"JS heap {heap_mb:.0f} MB, {reading['nodes']} node")
+        if rss_mb is not None:
+            self.peak_rss_mb = max(self.peak_rss_mb, rss_mb)
+            metrics.set_gauge("browser_rss_bytes", int(rss_mb * MB))
+            parts.append(f"RSS Chrome {rss_mb:.0f} MB")
+        if parts:
+            print(f"[Memory] {label}: {', '.join(parts)} ({self.pages} trang trên tab này)")
+
+        if self.every and self.pages >= self.every:
+            return f"đã chạy {self.pages} trang"
+        if self.heap_mb and heap_mb is not None and heap_mb >= self.heap_mb:
+            return f"JS heap {heap_mb:.0f} MB >= {self.heap_mb} MB"
+        if self.rss_mb and rss_mb is not None and rss_mb >= self.rss_mb:
+            return f"RSS {rss_mb:.0f} MB >= {self.rss_mb} MB"
+        return None
+
+    # =========================
+    # ĐỔI TAB
+    # =========================
+    def new_page(self, page):
+        """Mở tab mới cùng context (giữ cookie / cache), đóng tab cũ"""
+        fresh = page.context.new_page()
+        try:
+            page.close()
+        except Exception:
+            pass
+
+        if page in self._opened:
+            self._opened.remove(page)
+        self._opened.append(fresh)
+        self._cdp = self._cdp_page = None
+        self.pages = 0
+        self.recycles += 1
+        metrics.inc("browser_recycles_total")
+        return fresh
+
+    def postpone(self):
+        """Chưa đổi tab được (không khôi phục được vị trí) -> đếm lại từ đầu"""
+        self.pages = 0
+
+    def close(self):
+        """Đóng các tab recycler đã mở (tab ban đầu do BrowserPool / browser.close() lo)"""
+        for page in self._opened:
+            try:
+                page.close()
+            except Exception:
+                pass
+        self._opened = []
+
+    def summary(self):
+        return {
+            "recycles": self.recycles,
+            "peak_js_heap_mb": round(self.peak_heap_mb, 1),
+            "peak_rss_mb": round(self.peak_rss_mb, 1) if psutil else None,
+        }
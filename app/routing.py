@@ -0,0 +1,171 @@
+import re
+import json
+from urllib.parse import urlparse
+
+from app.config import (
+    ROUTE_MODE,
+    ROUTE_BLOCK_TYPES,
+    ROUTE_BLOCK_PATTERNS,
+    ROUTE_STUB_PATTERNS,
+)
+from app.state import get_meta, set_meta
+from app.metrics import metrics
+
+
+# Nội dung trả về thay cho request bị "stub" (trang vẫn nhận 200, không báo lỗi)
+STUB_BODIES = {
+    "script": ("application/javascript", ""),
+    "stylesheet": ("text/css", ""),
+    "xhr": ("application/json", "{}"),
+    "fetch": ("application/json", "{}"),
+}
+
+
+class RoutePolicy:
+    """
+    Chặn / stub tài nguyên không cần cho việc trích xuất ảnh (font, media, quảng cáo, tracker...).
+    mode="block": chặn thật qua page.route
+    mode="audit": không chặn, chỉ đo số request + bytes SẼ bị chặn (để chỉnh luật cho từng site)
+    defer_images=True: không tải ảnh trong browser (chỉ dùng khi tắt capture, aiohttp sẽ tải sau)
+
+    Lưu ý: bật page.route thì Playwright tắt HTTP cache của trang đó.
+    """
+
+    def __init__(self, target_url, mode=ROUTE_MODE, block_types=ROUTE_BLOCK_TYPES,
+                 block_patterns=ROUTE_BLOCK_PATTERNS, stub_patterns=ROUTE_STUB_PATTERNS,
+                 defer_images=False):
+        self.host = urlparse(target_url).hostname or ""
+        self.mode = mode
+        self.block_types = set(block_types)
+        self.block_re = re.compile("|".join(block_patterns)) if block_patterns else None
+        self.stub_re = re.compile("|".join(stub_patterns)) if stub_patterns else None
+        if defer_images:
+            self.block_types.add("image")
+
+        # Số liệu trang hiện tại + toàn bộ lần chạy
+        self.page_counts = {}
+        self.page_bytes = 0
+        self.total_requests = 0
+        self.total_bytes = 0
+        self.load_times = []
+
+        # Số liệu lần audit trước của site này (để ước tính phần tiết kiệm khi block)
+        baseline = get_meta(f"route_audit:{self.host}")
+        self.baseline = json.loads(baseline) if baseline else None
+
+    # =========================
+    # LUẬT
+    # =========================
+    def decide(self, resource_type, url):
+        """None = cho qua, "block" = hủy request, "stub" = trả về rỗng"""
+        if self.stub_re and self.stub_re.search(url):
+            return "stub"
+        if resource_type in self.block_types:
+            return "block"
+        if self.block_re and self.block_re.search(url):
+            return "block"
+        return None
+
+    def attach(self, page):
+        if self.mode == "block":
+            page.route("**/*", self._on_route)
+        elif self.mode == "audit":
+            page.on("response", self._on_response)
+        return self
+
+    def _count(self, resource_type, size=0):
+        self.page_counts[resource_type] = self.page_counts.get(resource_type, 0) + 1
+        self.page_bytes += size
+        self.total_requests += 1
+        self.total_bytes += size
+        metrics.inc("route_blocked_total", type=resource_type, mode=self.mode)
+        if size:
+            metrics.inc("route_blocked_bytes_total", size)
+
+    def _on_route(self, route):
+        request = route.request
+        action = self.decide(request.resource_type, request.url)
+
+        if action is None:
+            route.continue_()
+            return
+
+        self._count(request.resource_type)
+        if action == "stub" and request.resource_type in STUB_BODIES:
+            content_type, body = STUB_BODIES[request.resource_type]
+            route.fulfill(status=200, content_type=content_type, body=body)
+        else:
+            route.abort("blockedbyclient")
+
+    def _on_response(self, response):
+        request = response.request
+        if self.decide(request.resource_type, request.url) is None:
+            return
+        # Chỉ đọc header (không tải body) -> ước tính, response chunked tính 0
+        try:
+            size = int(response.headers.get("content-length") or 0)
+        except ValueError:
+            size = 0
+        self._count(request.resource_type, size)
+
+    # =========================
+    # REPORT
+    # =========================
+    def _estimated_bytes(self, requests):
+        if self.mode == "audit":
+            return None
+        if not self.baseline or not self.baseline.get("bytes_per_request"):
+            return None
+        return requests * self.baseline["bytes_per_request"]
+
+    def report_page(self, label, load_seconds):
+        """In số request đã chặn + bytes tiết kiệm + thời gian tải của một trang"""
+        if self.mode == "off":
+            return
+
+        self.load_times.append(load_seconds)
+        requests = sum(self.page_counts.values())
+        detail = ", ".join(f"{t} {n}" for t, n in sorted(self.page_counts.items())) or "không có"
+
+        if self.mode == "audit":
+            saved = f"sẽ chặn {requests} request ({detail}), ~{self.page_bytes / 1024:.0f} KB"
+        else:
+            estimated = self._estimated_bytes(requests)
+            saved = f"chặn {requests} request ({detail})"
+            if estimated is not None:
+                saved += f", tiết kiệm ~{estimated / 1024:.0f} KB"
+
+        timing = f"tải {load_seconds:.2f}s"
+        if self.mode == "block" and self.baseline and self.baseline.get("load"):
+            timing += f" (audit {self.baseline['load']:.2f}s)"
+
+        print(f"[Route] {label}: {saved} | {timing}")
+        self.page_counts = {}
+        self.page_bytes = 0
+
+    def summary(self):
+        """Tổng kết cho run summary; lần audit được lưu lại làm mốc so sánh của site"""
+        avg_load = sum(self.load_times) / len(self.load_times) if self.load_times else 0.0
+        result = {
+            "mode": self.mode,
+            "requests": self.total_requests,
+            "avg_load_seconds": round(avg_load, 3),
+        }
+
+        if self.mode == "audit":
+            result["bytes"] = self.total_bytes
+            if self.total_requests and self.load_times:
+                set_meta(f"route_audit:{self.host}", json.dumps({
+                    "load": avg_load,
+                    "bytes_per_request": self.total_bytes / self.total_requests,
+                }))
+        elif self.mode == "block":
+            estimated = self._estimated_bytes(self.total_requests)
+            if estimated is not None:
+                result["bytes_saved_estimate"] = int(estimated)
+            if self.baseline and self.baseline.get("load") and self.load_times:
+                result["load_reduction"] = round(1 - avg_load / self.baseline["load"], 3)
+
+        if self.mode != "off":
+            print(f"[Route] Tổng: {self.total_requests} request ({self.mode}), tải trung bình {avg_load:.2f}s/trang")
+        return result
@@ -1,69 +1,54 @@
-import json
-import os
-from app.config import STATE_FILE, INFO_DIR
+from app.store import get_store
+from app.exporter import compact_data_log
 
 
 def load_state():
-    os.makedirs(INFO_DIR, exist_ok=True)
-
-    if not os.path.exists(STATE_FILE):
-        return {
-            "hashes": set(),
-            "last_stt": 0
-        }
-
-    try:
-        with open(STATE_FILE, "r", encoding="utf-8") as f:
-            data = json.load(f)
-
-            return {
-                "hashes": set(data.get("hashes", [])),
-                "last_stt": data.get("last_stt", 0)
-            }
-    except Exception:
-        return {
-            "hashes": set(),
-            "last_stt": 0
-        }
-
-
-def save_state(state):
-    os.makedirs(INFO_DIR, exist_ok=True)
-
-    with open(STATE_FILE, "w", encoding="utf-8") as f:
-        json.dump(
-            {
-                "hashes": list(state["hashes"]),
-                "last_stt": state["last_stt"]
-            },
-            f,
-            ensure_ascii=False,
-            indent=2
-        )
+    store = get_store()
+    return {
+        "hashes": store.all_hashes(),
+        "last_stt": store.get_last_stt()
+    }
 
 
 def has_hash(h):
-    state = load_state()
-    return h in state["hashes"]
+    return get_store().has_hash(h)
 
 
 def add_hash_and_inc_stt(h):
-    state = load_state()
-    state["hashes"].add(h)
-    state["last_stt"] += 1
-    save_state(state)
-    return state["last_stt"]
+    return get_store().add_hash_and_inc_stt(h)
+
+
+def claim_record(h, make_record):
+    return get_store().claim_record(h, make_record)
 
 
 def get_last_stt():
-    return load_state()["last_stt"]
+    return get_store().get_last_stt()
+
 
 def remove_hash(h):
-    state = load_state()
+    get_store().remove_hash(h)
+
+
+def get_url_info(url):
+    return get_store().get_url(url)
+
+
+def remember_url(url, h, etag=None, last_modified=None, size=None):
+    get_store().put_url(url, h, etag, last_modified, size)
+
+
+def get_meta(key, default=None):
+    return get_store().get_meta(key, default)
+
+
+def set_meta(key, value):
+    get_store().set_meta(key, value)
 
-    hashes = state.get("hashes", [])
-    if h in hashes:
-        hashes.remove(h)
 
-    state["hashes"] = hashes
-    save_state(state)
\ No newline at end of file
+def reset_state():
+    store = get_store()
+    store.reset()
+    # File ảnh được giữ lại -> UI liệt kê blob không còn bản ghi (storage.orphan_blobs)
+    store.set_meta("orphan_blobs", "1")
+    compact_data_log()
@@ -0,0 +1,198 @@
+import os
+
+from app.config import PICTURE_DIR, BLOB_DIR, STORAGE_LAYOUT, PICTURE_VIEW
+from app.store import get_store
+from app.hashing import digest_hex, file_hash
+from app.exporter import compact_data_log
+
+
+# =========================
+# BỐ CỤC LƯU ẢNH
+# =========================
+# "flat":    data/picture/{stt:03d}_{title}{ext} (kiểu cũ)
+# "sharded": data/blobs/ab/cd/<hash> theo nội dung, tên STT/title nằm trong bản ghi;
+#            PICTURE_VIEW = "hardlink" / "symlink" -> data/picture chỉ là "góc nhìn" trỏ vào blob
+
+_view_warned = False
+
+
+def temp_dir():
+    """Thư mục cho file tạm (cùng ổ đĩa với nơi lưu thật -> os.replace không phải copy)"""
+    folder = BLOB_DIR if STORAGE_LAYOUT == "sharded" else PICTURE_DIR
+    os.makedirs(folder, exist_ok=True)
+    return folder
+
+
+def blob_path(image_hash):
+    digest = digest_hex(image_hash)
+    return os.path.join(BLOB_DIR, digest[:2], digest[2:4], digest)
+
+
+def link_view(target, view_path):
+    """Tạo link tên dễ đọc trong PICTURE_DIR trỏ tới blob. Trả về view_path hoặc None."""
+    global _view_warned
+    if PICTURE_VIEW not in ("hardlink", "symlink"):
+        return None
+
+    try:
+        if os.path.lexists(view_path):
+            os.remove(view_path)
+        if PICTURE_VIEW == "hardlink":
+            os.link(target, view_path)
+        else:
+            os.symlink(target, view_path)
+        return view_path
+    except OSError as e:
+        # vd: symlink trên Windows cần quyền admin, hardlink khác ổ đĩa
+        if not _view_warned:
+            print(f"[Storage] Không tạo được {PICTURE_VIEW} trong {PICTURE_DIR}: {e}")
+            _view_warned = True
+        return None
+
+
+def plan_location(image_hash, filename):
+    """
+    Các trường đường dẫn của bản ghi, tính trước khi chuyển file (chưa đụng tới đĩa):
+    flat -> {local_image_path}, sharded -> {local_image_path (blob), filename (tên STT/title), view_path}.
+    """
+    if STORAGE_LAYOUT != "sharded":
+        return {"local_image_path": os.path.join(PICTURE_DIR, filename)}
+
+    view = PICTURE_VIEW in ("hardlink", "symlink")
+    return {
+        "local_image_path": blob_path(image_hash),
+        "filename": filename,
+        "view_path": os.path.join(PICTURE_DIR, filename) if view else None,
+    }
+
+
+def place_file(tmp_path, image_hash, filename):
+    """
+    Chuyển file tạm đã hash vào kho.
+    Trả về các trường đường dẫn thực tế (như plan_location; view_path None nếu không tạo được link).
+    """
+    if STORAGE_LAYOUT != "sharded":
+        path = os.path.join(PICTURE_DIR, filename)
+        os.replace(tmp_path, path)
+        return {"local_image_path": path}
+
+    path = blob_path(image_hash)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    os.replace(tmp_path, path)
+
+    os.makedirs(PICTURE_DIR, exist_ok=True)
+    return {
+        "local_image_path": path,
+        "filename": filename,
+        "view_path": link_view(path, os.path.join(PICTURE_DIR, filename)),
+    }
+
+
+def remove_file(record_or_path):
+    """Xóa blob + link view của một bản ghi (hoặc một đường dẫn)"""
+    if isinstance(record_or_path, dict):
+        paths = [record_or_path.get("local_image_path"), record_or_path.get("view_path")]
+    else:
+        paths = [record_or_path]
+
+    for path in paths:
+        if path and os.path.lexists(path):
+            os.remove(path)
+            _prune_shards(path)
+
+
+def _prune_shards(path):
+    """Xóa các thư mục shard ab/cd đã rỗng sau khi xóa blob"""
+    blob_root = os.path.abspath(BLOB_DIR)
+    folder = os.path.dirname(os.path.abspath(path))
+    while folder.startswith(blob_root + os.sep):
+        try:
+            os.rmdir(folder)
+        except OSError:
+            return
+        folder = os.path.dirname(folder)
+
+
+def orphan_blobs(known_paths):
+    """
+    Blob không còn bản ghi nào trỏ tới (reset lịch sử xóa bản ghi nhưng giữ lại file ảnh).
+    Chỉ quét data/blobs khi đã từng reset (meta "orphan_blobs"); hết blob mồ côi -> tắt cờ.
+    """
+    store = get_store()
+    if not store.get_meta("orphan_blobs"):
+        return []
+
+    known = {os.path.abspath(p) for p in known_paths if p}
+    orphans = []
+    for root, _, files in os.walk(BLOB_DIR):
+        for name in files:
+            path = os.path.join(root, name)
+            # file tạm đang tải dở nằm ngay trong BLOB_DIR
+            if not name.startswith(".tmp_") and os.path.abspath(path) not in known:
+                orphans.append(path)
+
+    if not orphans:
+        store.set_meta("orphan_blobs", "")
+    return sorted(orphans)
+
+
+def display_name(record):
+    """Tên hiển thị (STT + title) của bản ghi, không phụ thuộc bố cục lưu"""
+    return record.get("filename") or os.path.basename(record.get("local_image_path") or "")
+
+
+# =========================
+# MIGRATION flat -> sharded (một lần)
+# =========================
+def migrate_flat():
+    """
+    Chuyển ảnh đang nằm phẳng trong PICTURE_DIR (theo bản ghi) sang blob sharded,
+    cập nhật bản ghi + data.json. Tên cũ được giữ lại dưới dạng view (nếu bật).
+    Trả về số ảnh đã chuyển.
+    """
+    store = get_store()
+    picture_dir = os.path.abspath(PICTURE_DIR)
+    moved = []
+
+    for record in store.records():
+        path = record.get("local_image_path")
+        if not path or os.path.dirname(os.path.abspath(path)) != picture_dir or not os.path.isfile(path):
+            continue
+        if os.path.islink(path):
+            continue
+
+        image_hash = record.get("hash") or file_hash(path)
+        target = blob_path(image_hash)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        if os.path.exists(target):
+            os.remove(path)
+        else:
+            os.replace(path, target)
+
+        filename = os.path.basename(path)
+        record.update({
+            "local_image_path": target,
+            "hash": image_hash,
+            "filename": filename,
+            "view_path": link_view(target, path),
+        })
+        moved.append(record)
+
+    if moved:
+        # Đường dẫn đổi -> ghi đè bản ghi theo STT rồi dựng lại data.json
+        store.add_records(moved)
+        compact_data_log()
+        print(f"[Storage] Đã chuyển {len(moved)} ảnh sang {BLOB_DIR} (sharded)")
+    return len(moved)
+
+
+def ensure_layout():
+    """Gọi lúc khởi động: bố cục sharded mà kho chưa chuyển -> chạy migration một lần"""
+    if STORAGE_LAYOUT != "sharded":
+        return
+    store = get_store()
+    if store.get_meta("storage_layout") == "sharded":
+        return
+
+    migrate_flat()
+    store.set_meta("storage_layout", "sharded")
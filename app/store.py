@@ -0,0 +1,307 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+from app.config import STATE_DB_FILE, STATE_FILE, DATA_FILE
+from app.metrics import metrics
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT
+);
+
+CREATE TABLE IF NOT EXISTS hashes (
+    hash TEXT PRIMARY KEY
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS records (
+    stt              INTEGER PRIMARY KEY,
+    local_image_path TEXT,
+    hash             TEXT,
+    data             TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS urls (
+    url           TEXT PRIMARY KEY,
+    hash          TEXT,
+    etag          TEXT,
+    last_modified TEXT,
+    size          INTEGER
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS idx_records_path ON records(local_image_path);
+CREATE INDEX IF NOT EXISTS idx_records_hash ON records(hash);
+"""
+
+
+class Store:
+    """
+    Kho trạng thái bền vững: SQLite (WAL) có index + cache trong tiến trình.
+    Gom hash, STT toàn cục và bản ghi data.json vào một chỗ,
+    mỗi thao tác chỉ tốn O(1) / O(log N) thay vì đọc-ghi lại cả file JSON.
+    """
+
+    def __init__(self, path=STATE_DB_FILE):
+        self.path = path
+        self._lock = threading.RLock()
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        is_new = not os.path.exists(path)
+
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+
+        if is_new:
+            self._import_legacy()
+
+        # ===== CACHE =====
+        self._known_hashes = set()
+        self._last_stt = int(self.get_meta("last_stt", 0))
+
+    # =========================
+    # INTERNAL
+    # =========================
+    @contextmanager
+    def _tx(self):
+        with self._lock:
+            started = time.perf_counter()
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._conn
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            else:
+                self._conn.execute("COMMIT")
+                metrics.observe("state_write_seconds", time.perf_counter() - started)
+
+    def _import_legacy(self):
+        """Nhập state.json / data.json cũ (chỉ chạy một lần khi tạo DB)"""
+        hashes = []
+        last_stt = 0
+
+        if os.path.exists(STATE_FILE):
+            try:
+                with open(STATE_FILE, "r", encoding="utf-8") as f:
+                    state = json.load(f)
+                hashes = list(state.get("hashes", []))
+                last_stt = int(state.get("last_stt", 0))
+            except Exception:
+                pass
+
+        records = []
+        if os.path.exists(DATA_FILE):
+            try:
+                with open(DATA_FILE, "r", encoding="utf-8") as f:
+                    records = json.load(f)
+                if not isinstance(records, list):
+                    records = []
+            except Exception:
+                records = []
+
+        with self._tx() as conn:
+            conn.executemany(
+                "INSERT OR IGNORE INTO hashes(hash) VALUES (?)",
+                ((h,) for h in hashes),
+            )
+            self._insert_records(conn, records)
+            max_stt = max((r.get("stt", 0) for r in records), default=0)
+            self._set_meta(conn, "last_stt", max(last_stt, max_stt))
+
+        if hashes or records:
+            print(f"[State] Đã chuyển {len(hashes)} hash, {len(records)} bản ghi sang {os.path.basename(self.path)}")
+
+    @staticmethod
+    def _set_meta(conn, key, value):
+        conn.execute(
+            "INSERT INTO meta(key, value) VALUES (?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+            (key, str(value)),
+        )
+
+    @staticmethod
+    def _insert_records(conn, records):
+        conn.executemany(
+            "INSERT OR REPLACE INTO records(stt, local_image_path, hash, data) VALUES (?, ?, ?, ?)",
+            (
+                (
+                    r.get("stt"),
+                    r.get("local_image_path"),
+                    r.get("hash"),
+                    json.dumps(r, ensure_ascii=False),
+                )
+                for r in records
+            ),
+        )
+
+    # =========================
+    # META
+    # =========================
+    def get_meta(self, key, default=None):
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+
+    def set_meta(self, key, value):
+        with self._tx() as conn:
+            self._set_meta(conn, key, value)
+
+    # =========================
+    # HASH + STT
+    # =========================
+    def has_hash(self, h):
+        if h in self._known_hashes:
+            return True
+
+        with self._lock:
+            row = self._conn.execute("SELECT 1 FROM hashes WHERE hash = ?", (h,)).fetchone()
+
+        if row:
+            self._known_hashes.add(h)
+            return True
+        return False
+
+    def add_hash_and_inc_stt(self, h):
+        with self._tx() as conn:
+            conn.execute("INSERT OR IGNORE INTO hashes(hash) VALUES (?)", (h,))
+            row = conn.execute("SELECT value FROM meta WHERE key = 'last_stt'").fetchone()
+            stt = int(row[0] if row else 0) + 1
+            self._set_meta(conn, "last_stt", stt)
+
+        self._known_hashes.add(h)
+        self._last_stt = stt
+        return stt
+
+    def claim_record(self, h, make_record):
+        """
+        Kiểm tra hash + cấp STT + ghi bản ghi make_record(stt) trong MỘT giao dịch
+        (crash giữa chừng không còn ảnh có hash mà thiếu bản ghi).
+        Trả về bản ghi, hoặc None nếu hash đã tồn tại.
+        """
+        if h in self._known_hashes:
+            return None
+
+        record = None
+        with self._tx() as conn:
+            cur = conn.execute("INSERT OR IGNORE INTO hashes(hash) VALUES (?)", (h,))
+            if cur.rowcount:
+                row = conn.execute("SELECT value FROM meta WHERE key = 'last_stt'").fetchone()
+                stt = int(row[0] if row else 0) + 1
+                self._set_meta(conn, "last_stt", stt)
+                record = make_record(stt)
+                self._insert_records(conn, [record])
+
+        self._known_hashes.add(h)
+        if record is not None:
+            self._last_stt = record["stt"]
+        return record
+
+    def remove_hash(self, h):
+        with self._tx() as conn:
+            conn.execute("DELETE FROM hashes WHERE hash = ?", (h,))
+        self._known_hashes.discard(h)
+
+    def get_last_stt(self):
+        return self._last_stt
+
+    def all_hashes(self):
+        with self._lock:
+            return {row[0] for row in self._conn.execute("SELECT hash FROM hashes")}
+
+    # =========================
+    # URL INDEX
+    # =========================
+    def get_url(self, url):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT hash, etag, last_modified, size FROM urls WHERE url = ?", (url,)
+            ).fetchone()
+        if not row:
+            return None
+        return {"hash": row[0], "etag": row[1], "last_modified": row[2], "size": row[3]}
+
+    def put_url(self, url, h, etag=None, last_modified=None, size=None):
+        with self._tx() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO urls(url, hash, etag, last_modified, size) VALUES (?, ?, ?, ?, ?)",
+                (url, h, etag, last_modified, size),
+            )
+
+    # =========================
+    # RECORDS (data.json)
+    # =========================
+    def add_records(self, items):
+        with self._tx() as conn:
+            self._insert_records(conn, items)
+
+    def records(self):
+        with self._lock:
+            rows = self._conn.execute("SELECT data FROM records ORDER BY stt").fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def delete_records_by_paths(self, paths, chunk_size=500):
+        """Xóa nhiều bản ghi (tra qua index đường dẫn) + hash của chúng trong MỘT giao dịch"""
+        paths = list(paths)
+        removed = []
+
+        with self._tx() as conn:
+            for i in range(0, len(paths), chunk_size):
+                chunk = paths[i:i + chunk_size]
+                marks = ",".join("?" * len(chunk))
+                rows = conn.execute(
+                    f"SELECT data, hash FROM records WHERE local_image_path IN ({marks})", chunk
+                ).fetchall()
+                conn.execute(f"DELETE FROM records WHERE local_image_path IN ({marks})", chunk)
+                conn.executemany(
+                    "DELETE FROM hashes WHERE hash = ?",
+                    ((row[1],) for row in rows if row[1]),
+                )
+                removed.extend(json.loads(row[0]) for row in rows)
+
+        for record in removed:
+            self._known_hashes.discard(record.get("hash"))
+        return removed
+
+    def write_snapshot(self, path=DATA_FILE):
+        """Xuất toàn bộ bản ghi ra data.json (ghi file tạm rồi thay thế nguyên tử)"""
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.records(), f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, path)
+
+    # =========================
+    # RESET
+    # =========================
+    def reset(self):
+        with self._tx() as conn:
+            conn.execute("DELETE FROM hashes")
+            conn.execute("DELETE FROM records")
+            conn.execute("DELETE FROM urls")
+            self._set_meta(conn, "last_stt", 0)
+
+        self._known_hashes.clear()
+        self._last_stt = 0
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    """Store dùng chung cho cả tiến trình (UI, crawler, downloader)"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = Store()
+        return _store
@@ -0,0 +1,137 @@
+import time
+import asyncio
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+
+from app.config import (
+    MAX_CONCURRENT_DOWNLOAD,
+    MAX_CONCURRENT_DOWNLOAD_CEILING,
+    THROTTLE_LATENCY_FACTOR,
+)
+
+
+# Status coi như "server quá tải" -> giảm concurrency + thử lại
+RETRY_STATUSES = (429, 503)
+
+
+def parse_retry_after(value):
+    """Retry-After: số giây hoặc HTTP-date -> số giây (None nếu không đọc được)"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class HostLimiter:
+    """
+    Giới hạn concurrency cho MỘT host theo AIMD:
+    - thành công + latency ổn định -> tăng cộng (+1 sau mỗi ~limit request)
+    - 429/503/timeout hoặc latency tăng vọt -> giảm nhân
+    - latency = thời gian tới khi có header (TTFB), chỉ lấy từ response 200
+      (304 không có body, nhanh hơn hẳn -> không dùng làm mốc)
+    - Retry-After -> chặn host tới hết thời gian server yêu cầu
+    """
+
+    def __init__(self, host, start=MAX_CONCURRENT_DOWNLOAD, ceiling=MAX_CONCURRENT_DOWNLOAD_CEILING):
+        self.host = host
+        self.limit = float(start)
+        self.ceiling = ceiling
+        self.active = 0
+        self.blocked_until = 0.0
+
+        self.base_latency = None
+        self.latency = None
+        self.last_decrease = 0.0
+
+        self.requests = 0
+        self.errors = 0
+        self.throttled = 0
+        self.bytes = 0
+        self.started = time.monotonic()
+
+        self._cond = asyncio.Condition()
+
+    async def acquire(self):
+        while True:
+            wait = self.blocked_until - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+                continue
+
+            async with self._cond:
+                if self.blocked_until > time.monotonic():
+                    continue
+                if self.active < int(self.limit):
+                    self.active += 1
+                    return
+                await self._cond.wait()
+
+    def _decrease(self, now, factor):
+        # Một đợt lỗi dồn dập chỉ tính là một lần giảm
+        if now - self.last_decrease < max(self.latency or 0.0, 1.0):
+            return
+        self.limit = max(1.0, self.limit * factor)
+        self.last_decrease = now
+
+    async def release(self, status, size, latency, retry_after=None):
+        now = time.monotonic()
+        self.requests += 1
+
+        if status in (200, 304):
+            self.bytes += size
+            if status == 200:
+                self.latency = latency if self.latency is None else 0.8 * self.latency + 0.2 * latency
+                self.base_latency = latency if self.base_latency is None else min(self.base_latency, latency)
+
+            if self.latency is not None and self.latency > THROTTLE_LATENCY_FACTOR * self.base_latency:
+                # Hàng đợi phía server đang dài ra
+                self._decrease(now, 0.9)
+            else:
+                self.limit = min(float(self.ceiling), self.limit + 1.0 / self.limit)
+
+        elif status is None or status in RETRY_STATUSES:
+            if status is None:
+                self.errors += 1
+            else:
+                self.throttled += 1
+
+            self._decrease(now, 0.5)
+            if retry_after is not None:
+                self.blocked_until = max(self.blocked_until, now + retry_after)
+
+        async with self._cond:
+            self.active -= 1
+            self._cond.notify_all()
+
+    def summary(self):
+        elapsed = max(time.monotonic() - self.started, 1e-6)
+        return (
+            f"[Throttle] {self.host}: limit {int(self.limit)}/{self.ceiling}, "
+            f"{self.requests} request, {self.throttled} lần 429/503, {self.errors} lỗi, "
+            f"{self.bytes / elapsed / 1024:.1f} KB/s"
+        )
+
+
+class AdaptiveThrottle:
+    """Giữ một HostLimiter riêng cho từng hostname (CDN / origin)"""
+
+    def __init__(self, start=MAX_CONCURRENT_DOWNLOAD, ceiling=MAX_CONCURRENT_DOWNLOAD_CEILING):
+        self.start = start
+        self.ceiling = ceiling
+        self.hosts = {}
+
+    def limiter(self, url):
+        host = urlparse(url).hostname or ""
+        if host not in self.hosts:
+            self.hosts[host] = HostLimiter(host, self.start, self.ceiling)
+        return self.hosts[host]
+
+    def report(self):
+        for limiter in self.hosts.values():
+            print(limiter.summary())
@@ -0,0 +1,173 @@
+import time
+
+from playwright.sync_api import TimeoutError
+
+from app.config import WAIT_QUIET, WAIT_POLL
+from app.metrics import metrics
+
+
+# Đếm số <img> mới được gắn vào DOM (cài lại ở mỗi document mới)
+OBSERVER_JS = """() => {
+    if (window.__tcObserver) return;
+    window.__tcImgAdded = 0;
+    window.__tcObserver = new MutationObserver((mutations) => {
+        for (const m of mutations) {
+            for (const n of m.addedNodes) {
+                if (n.nodeType !== 1) continue;
+                if (n.tagName === "IMG") window.__tcImgAdded += 1;
+                else if (n.querySelectorAll) window.__tcImgAdded += n.querySelectorAll("img").length;
+            }
+        }
+    });
+    window.__tcObserver.observe(document, { childList: true, subtree: true });
+}"""
+
+CHANGED_JS = """([url, count]) =>
+    location.href !== url || (window.__tcImgAdded || 0) > count"""
+
+
+class WaitEngine:
+    """
+    Chờ theo sự kiện thay cho sleep cố định.
+    Xong ngay khi trang sẵn sàng (ảnh hết tải / DOM có <img> mới / scrollHeight tăng),
+    sleep cũ chỉ còn là thời gian chờ tối đa (budget).
+    """
+
+    def __init__(self, page):
+        self.page_timings = []
+        self.total_waited = 0.0
+        self.total_budget = 0.0
+
+        self.attach(page)
+
+    def attach(self, page):
+        """Nghe trang (mới); tổng thời gian chờ vẫn cộng dồn khi đổi trang (recycle)"""
+        self.page = page
+        self.inflight = set()
+        self.last_activity = time.monotonic()
+        self._mark = ("", 0)
+
+        page.on("request", self._on_request)
+        page.on("requestfinished", self._on_request_done)
+        page.on("requestfailed", self._on_request_done)
+
+        page.add_init_script(f"({OBSERVER_JS})()")
+        self.install_observer()
+
+    # =========================
+    # NETWORK TRACKING
+    # =========================
+    def _on_request(self, request):
+        if request.resource_type == "image":
+            self.inflight.add(request)
+            self.last_activity = time.monotonic()
+
+    def _on_request_done(self, request):
+        if request in self.inflight:
+            self.inflight.discard(request)
+            self.last_activity = time.monotonic()
+
+    def install_observer(self):
+        try:
+            self.page.evaluate(OBSERVER_JS)
+        except Exception:
+            pass
+
+    # =========================
+    # PRIMITIVES
+    # =========================
+    def _wait_quiet(self, deadline):
+        while time.monotonic() < deadline:
+            # wait_for_timeout (không phải time.sleep) để Playwright xử lý event
+            self.page.wait_for_timeout(WAIT_POLL * 1000)
+            if not self.inflight and time.monotonic() - self.last_activity >= WAIT_QUIET:
+                return True
+        return False
+
+    def _record(self, name, started, budget, ready):
+        elapsed = time.monotonic() - started
+        metrics.observe("crawl_wait_seconds", elapsed, ready=str(ready).lower())
+        self.page_timings.append((name, elapsed, budget, ready))
+        self.total_waited += elapsed
+        self.total_budget += budget
+        return ready
+
+    def settle_images(self, name, budget):
+        """Chờ tới khi không còn request ảnh nào đang tải trong WAIT_QUIET giây"""
+        started = time.monotonic()
+        ready = self._wait_quiet(started + budget)
+        return self._record(name, started, budget, ready)
+
+    def height_grows(self, name, previous_height, budget):
+        """Chờ document.body.scrollHeight lớn hơn previous_height"""
+        started = time.monotonic()
+        try:
+            self.page.wait_for_function(
+                "h => document.body.scrollHeight > h",
+                arg=previous_height,
+                timeout=budget * 1000,
+                polling=WAIT_POLL * 1000,
+            )
+            ready = True
+        except TimeoutError:
+            ready = False
+
+        return self._record(name, started, budget, ready)
+
+    def mark(self):
+        """Ghi lại URL + số <img> hiện tại, trước khi click / cuộn"""
+        try:
+            count = self.page.evaluate("() => window.__tcImgAdded || 0")
+        except Exception:
+            count = 0
+        self._mark = (self.page.url, count)
+
+    def page_changed(self, name, budget):
+        """
+        Sau khi chuyển trang: chờ URL đổi hoặc có <img> mới
+        (URL đổi -> chờ thêm domcontentloaded), rồi chờ ảnh tải xong trong phần budget còn lại.
+        """
+        started = time.monotonic()
+        try:
+            self.page.wait_for_function(
+                CHANGED_JS,
+                arg=list(self._mark),
+                timeout=budget * 1000,
+                polling=WAIT_POLL * 1000,
+            )
+        except TimeoutError:
+            return self._record(name, started, budget, False)
+
+        if self.page.url != self._mark[0]:
+            # Đổi document: chờ HTML mới parse xong, nếu không cửa sổ "không còn request ảnh"
+            # có thể trôi qua trước khi trang mới kịp yêu cầu ảnh nào
+            remaining = started + budget - time.monotonic()
+            try:
+                self.page.wait_for_load_state("domcontentloaded", timeout=max(remaining, 0.001) * 1000)
+            except TimeoutError:
+                return self._record(name, started, budget, False)
+
+        self.install_observer()
+
+        ready = self._wait_quiet(started + budget)
+        return self._record(name, started, budget, ready)
+
+    # =========================
+    # REPORT
+    # =========================
+    def report_page(self, label):
+        if not self.page_timings:
+            return
+
+        waited = sum(t[1] for t in self.page_timings)
+        budget = sum(t[2] for t in self.page_timings)
+        detail = ", ".join(
+            f"{name} {elapsed:.2f}/{b:g}s{'' if ready else ' (hết giờ)'}"
+            for name, elapsed, b, ready in self.page_timings
+        )
+        print(f"[Wait] {label}: {detail} | chờ {waited:.2f}s, tiết kiệm {budget - waited:.2f}s")
+        self.page_timings = []
+
+    def report_total(self):
+        saved = self.total_budget - self.total_waited
+        print(f"[Wait] Tổng: chờ {self.total_waited:.2f}s / tối đa {self.total_budget:.2f}s (tiết kiệm {saved:.2f}s)")
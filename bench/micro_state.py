@@ -0,0 +1,243 @@
+"""
+Micro-benchmark state / exporter / cleanup theo kích thước kho.
+
+    python -m bench.micro_state                       # 1k, 100k, 1M
+    python -m bench.micro_state --sizes 1000 100000   # nhanh hơn
+    python -m bench.micro_state --save-baseline       # ghi bench/baselines.json
+    python -m bench.micro_state --check               # exit 1 nếu chi phí tăng theo kích thước kho
+    python -m bench.micro_state --check --baseline-gate  # + so với bench/baselines.json
+
+Mỗi kích thước chạy trong một tiến trình con với TOOLCRAWLER_HOME riêng,
+state.json / data.json được seed bằng dữ liệu giả rồi để store tự nhập.
+--check:
+  1. theo kích thước (luôn bật): kho lớn nhất không được chậm hơn kho nhỏ nhất quá --scaling-limit lần
+     (chặn hành vi O(N) mỗi lần gọi quay lại, không phụ thuộc tốc độ máy)
+  2. so với baseline (chỉ khi --baseline-gate): chi phí / thao tác không được tăng quá --threshold.
+     Chi phí được chuẩn hóa theo một vòng hiệu chuẩn (SQLite :memory: + json) đo trong CÙNG tiến trình,
+     nhưng thao tác ghi đĩa (fsync) vẫn dao động mạnh giữa các máy -> chỉ dùng trên máy đã ghi baseline.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines.json")
+
+DEFAULT_SIZES = [1_000, 100_000, 1_000_000]
+
+# số lần gọi mỗi thao tác (đo chi phí trung bình / lần gọi)
+OPS = {
+    "has_hash": 2000,
+    "add_hash_and_inc_stt": 500,
+    "export_to_json": 20,
+    "flush_data_file": 20,
+    "delete_image_and_related": 200,
+    "remove_hash": 500,
+}
+EXPORT_BATCH = 50
+
+
+def fake_hash(i):
+    return f"{i:064x}"
+
+
+def seed(home, size):
+    info_dir = os.path.join(home, "data", "info")
+    picture_dir = os.path.join(home, "data", "picture")
+    os.makedirs(info_dir, exist_ok=True)
+    os.makedirs(picture_dir, exist_ok=True)
+
+    records = [
+        {
+            "stt": i + 1,
+            "title": f"Image_{i + 1}",
+            "local_image_path": os.path.join(picture_dir, f"{i + 1:03d}_Image_{i + 1}.jpg"),
+            "hash": fake_hash(i),
+        }
+        for i in range(size)
+    ]
+
+    with open(os.path.join(info_dir, "state.json"), "w", encoding="utf-8") as f:
+        json.dump({"hashes": [r["hash"] for r in records], "last_stt": size}, f)
+    with open(os.path.join(info_dir, "data.json"), "w", encoding="utf-8") as f:
+        json.dump(records, f)
+
+    # chỉ tạo file cho những ảnh sẽ bị xóa
+    for r in records[:OPS["delete_image_and_related"]]:
+        open(r["local_image_path"], "wb").close()
+
+    return records
+
+
+def timed(n, fn):
+    started = time.perf_counter()
+    for i in range(n):
+        fn(i)
+    return (time.perf_counter() - started) / n * 1e6
+
+
+def calibrate(n=5000):
+    """Đơn vị tốc độ máy: chi phí (us) một vòng SQLite :memory: + json cố định, lấy lần nhanh nhất"""
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE t (k TEXT PRIMARY KEY, v INTEGER)")
+
+    def op(i):
+        conn.execute("INSERT OR REPLACE INTO t VALUES (?, ?)", (fake_hash(i % 1000), i))
+        conn.execute("SELECT v FROM t WHERE k = ?", (fake_hash(i),)).fetchone()
+        json.dumps({"stt": i, "title": f"Image_{i}", "hash": fake_hash(i)})
+
+    timed(n // 10, op)
+    cost = min(timed(n, op) for _ in range(3))
+    conn.close()
+    return cost
+
+
+def run_worker(size):
+    """Chạy trong tiến trình con: seed + đo, in JSON ra dòng cuối stdout"""
+    home = os.environ["TOOLCRAWLER_HOME"]
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        records = seed(home, size)
+
+        from app.state import has_hash, add_hash_and_inc_stt, remove_hash
+        from app.exporter import export_to_json, flush_data_file
+        from app.cleanup import delete_image_and_related
+
+        # Mở store (nhập dữ liệu cũ) ngoài phần đo
+        started = time.perf_counter()
+        has_hash(fake_hash(0))
+        import_s = time.perf_counter() - started
+
+        results = {}
+        results["has_hash"] = timed(
+            OPS["has_hash"],
+            # xen kẽ hit / miss trên toàn bộ dải hash
+            lambda i: has_hash(fake_hash((i * 7919) % (2 * size))),
+        )
+        results["add_hash_and_inc_stt"] = timed(
+            OPS["add_hash_and_inc_stt"],
+            lambda i: add_hash_and_inc_stt(fake_hash(size * 2 + i)),
+        )
+
+        next_stt = size + OPS["add_hash_and_inc_stt"] + 1
+
+        def export(i):
+            base = next_stt + i * EXPORT_BATCH
+            export_to_json([
+                {"stt": base + k, "title": "new", "local_image_path": f"/new/{base + k}.jpg", "hash": fake_hash(size * 3 + base + k)}
+                for k in range(EXPORT_BATCH)
+            ])
+
+        results["export_to_json"] = timed(OPS["export_to_json"], export)
+        # cuối mỗi lần chạy: không được tốn O(toàn bộ lịch sử)
+        results["flush_data_file"] = timed(OPS["flush_data_file"], lambda i: flush_data_file())
+        results["delete_image_and_related"] = timed(
+            OPS["delete_image_and_related"],
+            lambda i: delete_image_and_related(records[i]["local_image_path"]),
+        )
+        results["remove_hash"] = timed(
+            OPS["remove_hash"],
+            lambda i: remove_hash(fake_hash(size - 1 - i)),
+        )
+
+        calibration = calibrate()
+
+    print(json.dumps({
+        "size": size,
+        "import_s": round(import_s, 3),
+        "calibration_us": round(calibration, 3),
+        "us_per_op": {k: round(v, 2) for k, v in results.items()},
+        # chi phí / thao tác tính theo đơn vị hiệu chuẩn (không phụ thuộc tốc độ máy)
+        "rel_per_op": {k: round(v / calibration, 3) for k, v in results.items()},
+    }))
+
+
+def run_size(size):
+    with tempfile.TemporaryDirectory(prefix="toolcrawler-micro-") as home:
+        env = dict(os.environ, TOOLCRAWLER_HOME=home)
+        out = subprocess.run(
+            [sys.executable, "-m", "bench.micro_state", "--worker", str(size)],
+            env=env, capture_output=True, text=True, check=True,
+        )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def check(results, baseline, threshold, scaling_limit):
+    failures = []
+
+    # baseline: {size: {op: chi phí theo đơn vị hiệu chuẩn}}
+    for r in results:
+        base_ops = baseline.get(str(r["size"]), {})
+        for op, cost in r["rel_per_op"].items():
+            base = base_ops.get(op)
+            if base and cost > base * (1 + threshold):
+                failures.append(
+                    f"{op} @ {r['size']}: {cost:.2f} > baseline {base:.2f} đơn vị hiệu chuẩn "
+                    f"({r['us_per_op'][op]:.1f}us, +{threshold:.0%})"
+                )
+
+    by_size = {r["size"]: r["us_per_op"] for r in results}
+
+    sizes = sorted(by_size)
+    if len(sizes) >= 2:
+        small, large = by_size[sizes[0]], by_size[sizes[-1]]
+        for op in small:
+            if small[op] > 0 and large[op] / small[op] > scaling_limit:
+                failures.append(
+                    f"{op}: {large[op]:.1f}us @ {sizes[-1]} vs {small[op]:.1f}us @ {sizes[0]} "
+                    f"(x{large[op] / small[op]:.1f} > x{scaling_limit:g})"
+                )
+
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmark state/exporter/cleanup")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--check", action="store_true")
+    parser.add_argument("--baseline-gate", action="store_true", help="--check so thêm với baselines.json")
+    parser.add_argument("--threshold", type=float, default=0.5, help="tăng tối đa so với baseline (0.5 = +50%%)")
+    parser.add_argument("--scaling-limit", type=float, default=5.0, help="kho lớn nhất / nhỏ nhất, tối đa bao nhiêu lần")
+    parser.add_argument("--worker", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args.worker)
+        return
+
+    results = []
+    for size in args.sizes:
+        print(f"[Micro] size={size} ...", file=sys.stderr)
+        results.append(run_size(size))
+
+    print(json.dumps(results, indent=2))
+
+    if args.save_baseline:
+        baseline = {str(r["size"]): r["rel_per_op"] for r in results}
+        with open(BASELINE_FILE, "w", encoding="utf-8") as f:
+            json.dump(baseline, f, indent=2)
+        print(f"[Micro] Đã lưu baseline: {BASELINE_FILE}", file=sys.stderr)
+
+    if args.check:
+        baseline = {}
+        if args.baseline_gate and os.path.exists(BASELINE_FILE):
+            with open(BASELINE_FILE, "r", encoding="utf-8") as f:
+                baseline = json.load(f)
+
+        failures = check(results, baseline, args.threshold, args.scaling_limit)
+        for failure in failures:
+            print(f"[Micro] FAIL {failure}", file=sys.stderr)
+        if failures:
+            sys.exit(1)
+        print("[Micro] OK", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
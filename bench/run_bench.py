@@ -0,0 +1,112 @@
+"""
+Benchmark toàn bộ pipeline crawl -> download -> export trên site giả lập.
+
+    python -m bench.run_bench --pages 20 --mode gallery --out bench_result.json
+
+Chrome lấy từ TOOLCRAWLER_CHROME (hoặc --chrome). Dữ liệu ghi vào thư mục tạm
+(TOOLCRAWLER_HOME) nên không đụng tới data/ thật. Kết quả là JSON để so sánh giữa các lần chạy.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+from bench.site import start_site, add_site_arguments, config_from_args
+
+
+def peak_rss_kb():
+    """Peak RSS (KB) của tiến trình này và của các tiến trình con (Chrome) đã kết thúc"""
+    try:
+        import resource
+    except ImportError:
+        return None, None
+
+    scale = 1 if sys.platform != "darwin" else 1 / 1024  # macOS trả về bytes
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * scale
+    return int(own), int(children)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark pipeline trên site giả lập")
+    add_site_arguments(parser)
+    parser.add_argument("--mode", choices=["gallery", "scroll"], default="gallery")
+    parser.add_argument("--chrome", help="đường dẫn Chrome/Chromium (mặc định: TOOLCRAWLER_CHROME)")
+    parser.add_argument("--home", help="thư mục dữ liệu (mặc định: thư mục tạm mới)")
+    parser.add_argument("--no-pipeline", action="store_true")
+    parser.add_argument("--no-capture", action="store_true")
+    parser.add_argument("--no-http", action="store_true", help="tắt HTTP fast path (luôn dùng Chrome)")
+    parser.add_argument("--out", help="ghi JSON kết quả ra file (mặc định: stdout)")
+    args = parser.parse_args()
+
+    # Phải đặt trước khi import app.* (config đọc env lúc import)
+    os.environ["TOOLCRAWLER_HOME"] = args.home or tempfile.mkdtemp(prefix="toolcrawler-bench-")
+    if args.chrome:
+        os.environ["TOOLCRAWLER_CHROME"] = args.chrome
+
+    # Chrome luôn headless: HEADLESS = True trong app/config.py
+    from app.crawler import run_crawler
+
+    cfg = config_from_args(args)
+    server, base_url = start_site(cfg)
+    target_url = f"{base_url}/gallery" if args.mode == "gallery" else f"{base_url}/scroll"
+
+    started = time.perf_counter()
+    summary = run_crawler(
+        1, args.pages,
+        target_url=target_url,
+        pipeline=not args.no_pipeline,
+        capture=not args.no_capture,
+        http_fast_path=not args.no_http,
+    ) or {}
+    wall = time.perf_counter() - started
+
+    server.shutdown()
+    own_rss, chrome_rss = peak_rss_kb()
+
+    result = {
+        "mode": args.mode,
+        "site": {
+            "pages": cfg.pages,
+            "images_per_page": cfg.images_per_page,
+            "image_size": cfg.image_size,
+            "latency_ms": cfg.latency_ms,
+            "error_rate": cfg.error_rate,
+        },
+        "pipeline": summary.get("pipeline"),
+        "capture": summary.get("capture"),
+        "engine": summary.get("engine"),
+        "wall_s": round(wall, 3),
+        "pages": summary.get("pages", 0),
+        "images_found": summary.get("images_found", 0),
+        "images_saved": summary.get("images_saved", 0),
+        "bytes": summary.get("bytes", 0),
+        "pages_per_s": round(summary.get("pages", 0) / wall, 3),
+        "images_per_s": round(summary.get("images_saved", 0) / wall, 3),
+        "bytes_per_s": round(summary.get("bytes", 0) / wall, 1),
+        "stages_s": {k: round(v, 3) for k, v in summary.get("timings", {}).items()},
+        "server": {
+            "requests": cfg.requests,
+            "image_requests": cfg.image_requests,
+            "image_bytes": cfg.image_bytes,
+            "errors": cfg.errors,
+        },
+        "metrics": summary.get("metrics"),
+        "peak_rss_kb": own_rss,
+        "peak_rss_children_kb": chrome_rss,
+        "data_dir": os.environ["TOOLCRAWLER_HOME"],
+    }
+
+    output = json.dumps(result, ensure_ascii=False, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(output)
+        print(f"[Bench] Đã ghi kết quả vào {args.out}")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+"""
+Site giả lập (local) để benchmark crawl/download.
+
+- /gallery/page/<n>   : trang phân trang, ảnh lazy (data-src) + nút Next
+- /scroll             : trang cuộn vô hạn, mỗi lần cuộn nạp thêm một lô ảnh
+- /scroll/batch/<k>   : HTML của lô thứ k (gọi bằng fetch từ /scroll)
+- /img/<id>.jpg       : payload ảnh giả lập (có độ trễ + tỉ lệ lỗi)
+
+Chạy riêng:  python -m bench.site --port 8800 --pages 20
+"""
+import argparse
+import hashlib
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class SiteConfig:
+    def __init__(self, pages=10, images_per_page=30, image_size=50_000,
+                 latency_ms=20, error_rate=0.0, seed=1):
+        self.pages = pages
+        self.images_per_page = images_per_page
+        self.image_size = image_size
+        self.latency_ms = latency_ms
+        self.error_rate = error_rate
+        self.seed = seed
+
+        self.lock = threading.Lock()
+        self.random = random.Random(seed)
+        self.requests = 0
+        self.image_requests = 0
+        self.image_bytes = 0
+        self.errors = 0
+
+
+# Nạp data-src khi ảnh vào màn hình (giống các site lazy-load thật)
+LAZY_JS = """
+<script>
+const io = new IntersectionObserver((entries) => {
+  for (const e of entries) {
+    if (e.isIntersecting && e.target.dataset.src) {
+      e.target.src = e.target.dataset.src;
+      io.unobserve(e.target);
+    }
+  }
+});
+function watch(root) { root.querySelectorAll("img[data-src]").forEach((img) => io.observe(img)); }
+watch(document);
+</script>
+"""
+
+SCROLL_JS = """
+<script>
+let next = 1, loading = false;
+window.addEventListener("scroll", async () => {
+  if (loading || next > %(pages)d) return;
+  if (window.innerHeight + window.scrollY < document.body.scrollHeight - 200) return;
+  loading = true;
+  const html = await (await fetch("/scroll/batch/" + next)).text();
+  const box = document.createElement("div");
+  box.innerHTML = html;
+  document.getElementById("feed").appendChild(box);
+  watch(box);
+  next += 1;
+  loading = false;
+});
+</script>
+"""
+
+
+def image_tags(batch, cfg):
+    tags = []
+    for i in range(cfg.images_per_page):
+        image_id = f"{batch}_{i}"
+        tags.append(
+            f'<div class="post" style="height:320px">'
+            f'<img data-src="/img/{image_id}.jpg" alt="Ảnh {image_id}" width="300" height="300">'
+            f'</div>'
+        )
+    # rác: icon nhỏ + favicon (phải bị bộ lọc loại bỏ)
+    tags.append('<img src="/img/icon.png" class="favicon" width="16" height="16">')
+    return "\n".join(tags)
+
+
+def gallery_page(n, cfg):
+    next_link = f'<a class="next" href="/gallery/page/{n + 1}">Next</a>' if n < cfg.pages else ""
+    return (
+        f"<html><head><title>Trang {n}</title></head><body>"
+        f"<h1>Trang {n}</h1>{image_tags(n, cfg)}{next_link}{LAZY_JS}</body></html>"
+    )
+
+
+def scroll_page(cfg):
+    return (
+        "<html><head><title>Feed</title></head><body>"
+        f'<div id="feed">{image_tags(0, cfg)}</div>{LAZY_JS}{SCROLL_JS % {"pages": cfg.pages}}</body></html>'
+    )
+
+
+def image_payload(image_id, size):
+    # Nội dung xác định theo id -> mỗi ảnh một hash khác nhau, lặp lại giữa các lần chạy
+    seed = hashlib.sha256(image_id.encode()).digest()
+    return (seed * (size // len(seed) + 1))[:size]
+
+
+def make_handler(cfg):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def _send(self, status, body, content_type):
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            with cfg.lock:
+                cfg.requests += 1
+
+            path = self.path.split("?")[0]
+            parts = path.strip("/").split("/")
+
+            if path in ("/", "/gallery"):
+                return self._send(200, gallery_page(1, cfg).encode(), "text/html; charset=utf-8")
+
+            if parts[:2] == ["gallery", "page"] and len(parts) == 3 and parts[2].isdigit():
+                n = int(parts[2])
+                if 1 <= n <= cfg.pages:
+                    return self._send(200, gallery_page(n, cfg).encode(), "text/html; charset=utf-8")
+
+            if path == "/scroll":
+                return self._send(200, scroll_page(cfg).encode(), "text/html; charset=utf-8")
+
+            if parts[:2] == ["scroll", "batch"] and len(parts) == 3 and parts[2].isdigit():
+                return self._send(200, image_tags(int(parts[2]), cfg).encode(), "text/html; charset=utf-8")
+
+            if parts[0] == "img" and len(parts) == 2:
+                time.sleep(cfg.latency_ms / 1000)
+                with cfg.lock:
+                    cfg.image_requests += 1
+                    failed = cfg.random.random() < cfg.error_rate
+                    if failed:
+                        cfg.errors += 1
+                if failed:
+                    return self._send(503, b"busy", "text/plain")
+
+                image_id = parts[1].rsplit(".", 1)[0]
+                size = 200 if image_id == "icon" else cfg.image_size
+                body = image_payload(image_id, size)
+                with cfg.lock:
+                    cfg.image_bytes += len(body)
+                return self._send(200, body, "image/png" if image_id == "icon" else "image/jpeg")
+
+            self._send(404, b"not found", "text/plain")
+
+    return Handler
+
+
+def start_site(cfg, host="127.0.0.1", port=0):
+    """Chạy site trong thread nền, trả về (server, base_url)"""
+    server = ThreadingHTTPServer((host, port), make_handler(cfg))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+def add_site_arguments(parser):
+    parser.add_argument("--pages", type=int, default=10)
+    parser.add_argument("--images-per-page", type=int, default=30)
+    parser.add_argument("--image-size", type=int, default=50_000, help="bytes mỗi ảnh")
+    parser.add_argument("--latency-ms", type=float, default=20, help="độ trễ mỗi request ảnh")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="tỉ lệ trả 503 cho ảnh (0..1)")
+    parser.add_argument("--seed", type=int, default=1)
+
+
+def config_from_args(args):
+    return SiteConfig(
+        pages=args.pages,
+        images_per_page=args.images_per_page,
+        image_size=args.image_size,
+        latency_ms=args.latency_ms,
+        error_rate=args.error_rate,
+        seed=args.seed,
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Site giả lập cho benchmark")
+    parser.add_argument("--port", type=int, default=8800)
+    add_site_arguments(parser)
+    args = parser.parse_args()
+
+    server, base_url = start_site(config_from_args(args), port=args.port)
+    print(f"Site giả lập: {base_url}/gallery  |  {base_url}/scroll")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
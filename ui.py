@@ -5,12 +5,18 @@ import sys
 import io
 import os
 import shutil
-import json
 import ctypes
 
 from app.crawler import run_crawler
-from app.config import STATE_FILE, DATA_FILE, PICTURE_DIR
-from app.cleanup import delete_image_and_related
+from app.browser import get_browser_pool
+from app.config import TARGET_URL
+from app.cleanup import delete_images
+from app.exporter import flush_data_file
+from app.state import reset_state
+from app.store import get_store
+from app.storage import ensure_layout, display_name, orphan_blobs
+from app.pagination import parse_page_range
+from app.checkpoint import load_checkpoint
 
 
 # =========================
@@ -47,6 +53,10 @@ class ToolUI:
         # 1. INITIALIZE CRITICAL STATE FIRST
         self.running = False
         self.stop_requested = False
+        self.cleanup_paths = {}  # tên hiển thị -> đường dẫn ảnh (theo bản ghi)
+
+        # Kho ảnh cũ (phẳng) -> chuyển sang sharded một lần trước khi liệt kê
+        ensure_layout()
         
         # 2. DEFINED COLORS (MUST be before any UI calls)
         self.hover_colors = {
@@ -131,6 +141,9 @@ class ToolUI:
         self.setup_ui()
         self.animate_status() # Start pulse animation
 
+        # 7. WARM BROWSER (mở Chrome + trang đầu sẵn trong nền)
+        self.browser_pool = get_browser_pool().start(TARGET_URL)
+
     def setup_ui(self):
         # MAIN CONTAINER
         main_container = tk.Frame(self.root, bg="#F7FAFC")
@@ -224,6 +237,9 @@ class ToolUI:
  
         self.reset_btn = self.create_styled_button(control_inner, "\U0001F504 Reset lịch sử", "#9F7AEA", self.reset_history)
         self.reset_btn.grid(row=0, column=2, padx=8, pady=5)
+
+        self.resume_btn = self.create_styled_button(control_inner, "\u23EF Tiếp tục", "#4299E1", self.resume_task)
+        self.resume_btn.grid(row=0, column=3, padx=8, pady=5)
  
         self.refresh_btn = None # Removed as requested
 
@@ -438,6 +454,7 @@ class ToolUI:
         self.exit_btn.config(state="disabled" if running else "normal")
         self.clear_btn.config(state="disabled" if running else "normal")
         self.reset_btn.config(state="disabled" if running else "normal")
+        self.resume_btn.config(state="disabled" if running else "normal")
         if self.refresh_btn: self.refresh_btn.config(state="disabled" if running else "normal")
         self.cleanup_delete_btn.config(state="disabled" if running else "normal")
         self.cleanup_deselect_btn.config(state="disabled" if running else "normal")
@@ -479,12 +496,15 @@ class ToolUI:
             return
 
         # Use TARGET_URL from config
-        from app.config import TARGET_URL
         url = TARGET_URL
 
         try:
-            start = int(self.start_entry.get())
-            end = int(self.end_entry.get())
+            # Ô đầu có thể nhập cả khoảng "500-520" (đã học mẫu URL -> nhảy thẳng tới trang 500)
+            if "-" in self.start_entry.get():
+                start, end = parse_page_range(self.start_entry.get())
+            else:
+                start = int(self.start_entry.get())
+                end = int(self.end_entry.get())
         except ValueError:
             messagebox.showerror("Lỗi", "Trang phải là số")
             return
@@ -505,8 +525,34 @@ class ToolUI:
             daemon=True
         ).start()
 
-    def run_worker(self, start, end, url):
-        total_pages = end - start + 1
+    def resume_task(self):
+        """Tiếp tục lần chạy dở (dừng / crash / đóng UI) từ checkpoint"""
+        if self.running:
+            messagebox.showinfo("Đang chạy", "Tool đang chạy, vui lòng chờ hoặc bấm Dừng.")
+            return
+
+        url = TARGET_URL
+        checkpoint = load_checkpoint(url)
+        if not checkpoint:
+            messagebox.showinfo("Thông báo", "Không có lần chạy dở để tiếp tục")
+            return
+
+        start = checkpoint["page"] + 1
+        end = checkpoint["end_page"]
+        print("\n--- TIẾP TỤC ---\n")
+        print(f"URL: {url} | trang {start} -> {end}, {len(checkpoint.get('pending', []))} ảnh chờ tải")
+        self.stop_requested = False
+        self.reset_progress()
+        self.set_running_state(True)
+
+        threading.Thread(
+            target=self.run_worker,
+            args=(start, end, url, True),
+            daemon=True
+        ).start()
+
+    def run_worker(self, start, end, url, resume=False):
+        total_pages = max(end - start + 1, 1)
         
         # Progress callback
         def progress_callback(current_page, status):
@@ -518,7 +564,9 @@ class ToolUI:
                 start, end, 
                 target_url=url, 
                 stop_flag=lambda: self.stop_requested,
-                progress_callback=progress_callback
+                progress_callback=progress_callback,
+                browser_pool=self.browser_pool,
+                resume=resume
             )
         finally:
             self.root.after(0, lambda: self.set_running_state(False))
@@ -547,17 +595,10 @@ class ToolUI:
     def reset_history(self):
         # Remove confirmation as requested: "ấn vào là xóa"
         try:
-            # Reset state.json
-            if os.path.exists(STATE_FILE):
-                with open(STATE_FILE, 'w', encoding='utf-8') as f:
-                    json.dump({"last_page": 0, "processed_count": 0}, f)
-            
-            # Clear data.json
-            if os.path.exists(DATA_FILE):
-                with open(DATA_FILE, 'w', encoding='utf-8') as f:
-                    json.dump([], f)
-                    
-            print("[OK] Đã reset lịch sử (state.json & data.json)")
+            # Reset state (hash + STT) & clear data.json
+            reset_state()
+
+            print("[OK] Đã reset lịch sử (state & data.json)")
         except Exception as e:
             print(f"[!] Lỗi khi reset: {str(e)}")
             
@@ -607,8 +648,12 @@ class ToolUI:
         self.cleanup_listbox.config(state="disabled")
 
     def reload_cleanup_images(self):
-        folder = PICTURE_DIR
-        images = sorted(os.listdir(folder)) if os.path.exists(folder) else []
+        # Liệt kê từ bản ghi (SQLite, đã sort theo STT) thay vì os.listdir cả thư mục ảnh
+        self.cleanup_paths = {display_name(r): r["local_image_path"] for r in get_store().records()}
+        # Ảnh còn trên đĩa nhưng mất bản ghi sau khi reset lịch sử -> vẫn xem / xóa được
+        for path in orphan_blobs(self.cleanup_paths.values()):
+            self.cleanup_paths[f"{os.path.basename(path)[:16]} (đã reset)"] = path
+        images = list(self.cleanup_paths)
         self.cleanup_listbox.config(state="normal")
         self.cleanup_listbox.delete(1.0, tk.END)
         for i, img in enumerate(images):
@@ -631,16 +676,12 @@ class ToolUI:
             filenames_to_delete.append(self.cleanup_listbox.get(start, end).strip())
 
         # Remove confirmation as requested: "ấn vào là xóa"
-        folder = PICTURE_DIR
-        deleted_count = 0
-        for filename in filenames_to_delete:
-            path = os.path.join(folder, filename)
-            if os.path.isfile(path):
-                delete_image_and_related(path)
-                deleted_count += 1
+        paths = [self.cleanup_paths[name] for name in filenames_to_delete if name in self.cleanup_paths]
+        deleted_count = delete_images(p for p in paths if os.path.isfile(p))
         
         if deleted_count > 0:
             print(f"[OK] Đã xóa {deleted_count} ảnh bạn đã chọn.")
+            flush_data_file()
 
         self.reload_cleanup_images()
 
@@ -652,6 +693,7 @@ class ToolUI:
             messagebox.showinfo("Đang chạy", "Vui lòng dừng trước khi thoát.")
             return
         if messagebox.askokcancel("Thoát", "Bạn có chắc muốn thoát không?"):
+            self.browser_pool.close()
             self.root.destroy()
 
 